@@ -4,6 +4,7 @@ from datetime import datetime, timedelta
 from pathlib import Path
 import random
 import os
+import unicodedata
 
 # Configuración
 OUTPUT_DIR = Path(__file__).parent / "example-data"
@@ -25,6 +26,7 @@ CATEGORIAS_PRODUCTO = [
 ROLES_EMPLEADOS = ["Repartidor","Cocinero","Despachador"]
 ROLES_USUARIOS = ["Cliente","Gerente","Admin"]
 ESTADOS_PEDIDO = ["procesando","cocinando","empacando","enviando","recibido"]
+ESTADOS_TERMINALES = {"recibido", "fallido"}
 
 USUARIOS_TOTAL   = int(os.getenv("USUARIOS_TOTAL", "30"))
 EMPLEADOS_TOTAL  = int(os.getenv("EMPLEADOS_TOTAL", "40"))
@@ -133,6 +135,11 @@ def generar_empleados(locales, cantidad=None):
         })
     return empleados
 
+def normalizar_nombre(texto: str) -> str:
+    """Clave de orden alfabético (LSI by_nombre): minúsculas y sin tildes."""
+    s = "".join(c for c in unicodedata.normalize("NFKD", texto) if not unicodedata.combining(c))
+    return " ".join(s.lower().split())
+
 def generar_productos(locales, cantidad=None):
     cantidad = max(1, cantidad or PRODUCTOS_TOTAL)
     productos = []
@@ -148,6 +155,7 @@ def generar_productos(locales, cantidad=None):
             "local_id": local["local_id"],
             "producto_id": producto_id,  # UUID
             "nombre": nombre,
+            "nombre_normalizado": normalizar_nombre(nombre),
             "precio": round(random.uniform(15, 80), 2),
             "descripcion": f"Delicioso plato de la categoría {categoria}",
             "categoria": categoria,
@@ -224,8 +232,13 @@ def generar_pedidos_y_historial(locales, usuarios, productos, cantidad=None):
             "costo": round(costo, 2),
             "direccion": f"Calle {random.randint(1,200)} #{random.randint(100,999)}",
             "estado": ultimo_estado,
-            "created_at": created_at                                 # Nuevo campo requerido
+            "created_at": created_at,                                # Nuevo campo requerido
+            "local_base": local_id,                                  # GSI by_local_updated
+            "updated_at": t_actual.isoformat()                       # Último cambio de estado
         }
+        # GSI disperso by_local_estado: solo pedidos activos
+        if ultimo_estado not in ESTADOS_TERMINALES:
+            pedido["local_estado"] = f"{local_id}#{ultimo_estado}"
 
         pedidos.append(pedido)
 
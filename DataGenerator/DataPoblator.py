@@ -32,6 +32,12 @@ TABLE_PRODUCTOS = os.getenv('TABLE_PRODUCTOS')
 TABLE_PEDIDOS = os.getenv('TABLE_PEDIDOS')
 TABLE_HISTORIAL_ESTADOS = os.getenv('TABLE_HISTORIAL_ESTADOS')
 TABLE_TOKENS_USUARIOS   = os.getenv('TABLE_TOKENS_USUARIOS')
+TABLE_IDEMPOTENCIA      = os.getenv('TABLE_IDEMPOTENCIA')
+TABLE_WS_CONEXIONES     = os.getenv('TABLE_WS_CONEXIONES')
+TABLE_WS_SUSCRIPCIONES  = os.getenv('TABLE_WS_SUSCRIPCIONES')
+TABLE_ESTADO_ACTUAL     = os.getenv('TABLE_ESTADO_ACTUAL')
+TABLE_GEOCACHE          = os.getenv('TABLE_GEOCACHE')  # opcional
+TABLE_RETRY_BUDGET      = os.getenv('TABLE_RETRY_BUDGET')  # opcional
 
 # Bucket S3 (para verificación; la carga de imágenes no se hace aquí)
 S3_BUCKET_NAME = os.getenv('S3_BUCKET_NAME')
@@ -466,7 +472,8 @@ def create_s3_bucket():
 
 
 def create_dynamodb_table(table_name, key_schema, attribute_definitions, 
-                          global_secondary_indexes=None, stream_enabled=False, ttl_attribute=None):
+                          global_secondary_indexes=None, stream_enabled=False, ttl_attribute=None,
+                          local_secondary_indexes=None):
     """Crea una tabla DynamoDB si no existe."""
     if not table_name:
         print("   ⚠️  Nombre de tabla no definido. Saltando creación.")
@@ -496,6 +503,10 @@ def create_dynamodb_table(table_name, key_schema, attribute_definitions,
                 if global_secondary_indexes:
                     table_config['GlobalSecondaryIndexes'] = global_secondary_indexes
                 
+                # Los LSIs solo pueden definirse al crear la tabla
+                if local_secondary_indexes:
+                    table_config['LocalSecondaryIndexes'] = local_secondary_indexes
+                
                 if stream_enabled:
                     table_config['StreamSpecification'] = {
                         'StreamEnabled': True,
@@ -568,6 +579,9 @@ def create_all_resources():
         return False
     
     # Productos: PK = local_id, SK = producto_id
+    # LSI:
+    #   - by_precio (local_id, precio)             -> catálogo ordenado por precio
+    #   - by_nombre (local_id, nombre_normalizado) -> catálogo en orden alfabético
     if not create_dynamodb_table(
         table_name=TABLE_PRODUCTOS,
         key_schema=[
@@ -576,14 +590,38 @@ def create_all_resources():
         ],
         attribute_definitions=[
             {'AttributeName': 'local_id', 'AttributeType': 'S'},
-            {'AttributeName': 'producto_id', 'AttributeType': 'S'}
-        ]
+            {'AttributeName': 'producto_id', 'AttributeType': 'S'},
+            {'AttributeName': 'precio', 'AttributeType': 'N'},
+            {'AttributeName': 'nombre_normalizado', 'AttributeType': 'S'}
+        ],
+        local_secondary_indexes=[
+            {
+                'IndexName': 'by_precio',
+                'KeySchema': [
+                    {'AttributeName': 'local_id', 'KeyType': 'HASH'},
+                    {'AttributeName': 'precio', 'KeyType': 'RANGE'}
+                ],
+                'Projection': {'ProjectionType': 'ALL'}
+            },
+            {
+                'IndexName': 'by_nombre',
+                'KeySchema': [
+                    {'AttributeName': 'local_id', 'KeyType': 'HASH'},
+                    {'AttributeName': 'nombre_normalizado', 'KeyType': 'RANGE'}
+                ],
+                'Projection': {'ProjectionType': 'ALL'}
+            }
+        ],
+        # Stream -> invalidación de la caché de productos
+        stream_enabled=True
     ):
         return False
     
     # Pedidos: PK = local_id, SK = pedido_id
     # GSI:
-    #   - by_usuario_v2 (tenant_id_usuario, created_at)
+    #   - by_usuario_v2 (correo, created_at) -> GET /pedido/historial
+    #   - by_local_estado (local_estado, created_at) -> tableros; disperso, solo pedidos activos
+    #   - by_local_updated (local_base, updated_at) -> delta-sync de tableros
     if not create_dynamodb_table(
         table_name=TABLE_PEDIDOS,
         key_schema=[
@@ -594,7 +632,10 @@ def create_all_resources():
             {'AttributeName': 'local_id', 'AttributeType': 'S'},
             {'AttributeName': 'pedido_id', 'AttributeType': 'S'},
             {'AttributeName': 'correo', 'AttributeType': 'S'},
-            {'AttributeName': 'created_at', 'AttributeType': 'S'}
+            {'AttributeName': 'created_at', 'AttributeType': 'S'},
+            {'AttributeName': 'local_estado', 'AttributeType': 'S'},
+            {'AttributeName': 'local_base', 'AttributeType': 'S'},
+            {'AttributeName': 'updated_at', 'AttributeType': 'S'}
         ],
         global_secondary_indexes=[
             {
@@ -604,8 +645,32 @@ def create_all_resources():
                     {'AttributeName': 'created_at', 'KeyType': 'RANGE'}
                 ],
                 'Projection': {'ProjectionType': 'ALL'}
+            },
+            {
+                'IndexName': 'by_local_estado',
+                'KeySchema': [
+                    {'AttributeName': 'local_estado', 'KeyType': 'HASH'},
+                    {'AttributeName': 'created_at', 'KeyType': 'RANGE'}
+                ],
+                'Projection': {
+                    'ProjectionType': 'INCLUDE',
+                    'NonKeyAttributes': ['estado', 'productos', 'direccion', 'cocinero_dni']
+                }
+            },
+            {
+                'IndexName': 'by_local_updated',
+                'KeySchema': [
+                    {'AttributeName': 'local_base', 'KeyType': 'HASH'},
+                    {'AttributeName': 'updated_at', 'KeyType': 'RANGE'}
+                ],
+                'Projection': {
+                    'ProjectionType': 'INCLUDE',
+                    'NonKeyAttributes': ['estado', 'created_at', 'productos', 'direccion', 'cocinero_dni']
+                }
             }
-        ]
+        ],
+        # Stream -> outbox_relay (CrearPedido) y ws_pusher (estados por WebSocket)
+        stream_enabled=True
     ):
         return False
     
@@ -632,6 +697,76 @@ def create_all_resources():
         ):
             return False
     
+    # Idempotencia de POST /pedido/create: PK = idempotency_key, TTL = expires_at
+    if TABLE_IDEMPOTENCIA:
+        if not create_dynamodb_table(
+            table_name=TABLE_IDEMPOTENCIA,
+            key_schema=[{'AttributeName': 'idempotency_key', 'KeyType': 'HASH'}],
+            attribute_definitions=[{'AttributeName': 'idempotency_key', 'AttributeType': 'S'}],
+            ttl_attribute='expires_at'
+        ):
+            return False
+    
+    # WebSocket de estados: conexiones (PK = connection_id) y suscripciones por pedido
+    if TABLE_WS_CONEXIONES:
+        if not create_dynamodb_table(
+            table_name=TABLE_WS_CONEXIONES,
+            key_schema=[{'AttributeName': 'connection_id', 'KeyType': 'HASH'}],
+            attribute_definitions=[{'AttributeName': 'connection_id', 'AttributeType': 'S'}],
+            ttl_attribute='expires_at'
+        ):
+            return False
+    
+    if TABLE_WS_SUSCRIPCIONES:
+        if not create_dynamodb_table(
+            table_name=TABLE_WS_SUSCRIPCIONES,
+            key_schema=[
+                {'AttributeName': 'pedido_id', 'KeyType': 'HASH'},
+                {'AttributeName': 'connection_id', 'KeyType': 'RANGE'}
+            ],
+            attribute_definitions=[
+                {'AttributeName': 'pedido_id', 'AttributeType': 'S'},
+                {'AttributeName': 'connection_id', 'AttributeType': 'S'}
+            ],
+            ttl_attribute='expires_at'
+        ):
+            return False
+    
+    # Estado actual de cada pedido (puntero al registro abierto del historial)
+    if TABLE_ESTADO_ACTUAL:
+        if not create_dynamodb_table(
+            table_name=TABLE_ESTADO_ACTUAL,
+            key_schema=[{'AttributeName': 'pedido_id', 'KeyType': 'HASH'}],
+            attribute_definitions=[{'AttributeName': 'pedido_id', 'AttributeType': 'S'}]
+        ):
+            return False
+    
+    # Caché de geocodificación de direcciones (lotes de delivery), opcional
+    if TABLE_GEOCACHE:
+        if not create_dynamodb_table(
+            table_name=TABLE_GEOCACHE,
+            key_schema=[{'AttributeName': 'direccion', 'KeyType': 'HASH'}],
+            attribute_definitions=[{'AttributeName': 'direccion', 'AttributeType': 'S'}],
+            ttl_attribute='expires_at'
+        ):
+            return False
+    
+    # Presupuesto de reintentos por local y ventana de tiempo, opcional
+    if TABLE_RETRY_BUDGET:
+        if not create_dynamodb_table(
+            table_name=TABLE_RETRY_BUDGET,
+            key_schema=[
+                {'AttributeName': 'local_id', 'KeyType': 'HASH'},
+                {'AttributeName': 'ventana', 'KeyType': 'RANGE'}
+            ],
+            attribute_definitions=[
+                {'AttributeName': 'local_id', 'AttributeType': 'S'},
+                {'AttributeName': 'ventana', 'AttributeType': 'N'}
+            ],
+            ttl_attribute='expires_at'
+        ):
+            return False
+    
     print("\n✅ Todos los recursos creados exitosamente")
     return True
 
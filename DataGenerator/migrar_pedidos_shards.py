@@ -0,0 +1,118 @@
+"""
+Migra la tabla de pedidos al esquema de PK con shards (local_id#shard).
+
+Orden recomendado:
+  1. Desplegar clientes/ y stepFunction/ con el nuevo PEDIDOS_SHARDS
+     (las escrituras nuevas ya usan shards y las lecturas caen a la PK original).
+  2. Correr este script: mueve cada fila a su PK nueva (Put + Delete en una transacción).
+
+Uso:
+  python DataGenerator/migrar_pedidos_shards.py [--shards N] [--dry-run]
+"""
+import os
+import sys
+import zlib
+import argparse
+import boto3
+from dotenv import load_dotenv
+from boto3.dynamodb.types import TypeSerializer
+from botocore.exceptions import ClientError
+
+load_dotenv()
+
+AWS_REGION = os.getenv('AWS_REGION', 'us-east-1')
+TABLE_PEDIDOS = os.getenv('TABLE_PEDIDOS')
+
+dynamodb = boto3.resource('dynamodb', region_name=AWS_REGION)
+dynamodb_client = boto3.client('dynamodb', region_name=AWS_REGION)
+serializer = TypeSerializer()
+
+
+def pedido_pk(local_id, pedido_id, shards):
+    """Misma regla que pedidos_keys.pedido_pk (clientes/ y stepFunction/handlers/)"""
+    if shards <= 1:
+        return local_id
+    return f"{local_id}#{zlib.crc32(pedido_id.encode('utf-8')) % shards}"
+
+
+def _serializar(item):
+    return {k: serializer.serialize(v) for k, v in item.items()}
+
+
+def mover(item, nueva_pk):
+    """Put con la PK nueva + Delete de la vieja, atómico"""
+    nuevo = dict(item, local_id=nueva_pk)
+    dynamodb_client.transact_write_items(TransactItems=[
+        {'Put': {
+            'TableName': TABLE_PEDIDOS,
+            'Item': _serializar(nuevo),
+            'ConditionExpression': 'attribute_not_exists(pedido_id)',
+        }},
+        {'Delete': {
+            'TableName': TABLE_PEDIDOS,
+            'Key': _serializar({'local_id': item['local_id'], 'pedido_id': item['pedido_id']}),
+            'ConditionExpression': 'attribute_exists(pedido_id)',
+        }},
+    ])
+
+
+def migrar(shards, dry_run=False):
+    table = dynamodb.Table(TABLE_PEDIDOS)
+    movidos = actualizados = sin_cambios = errores = 0
+
+    kwargs = {}
+    while True:
+        response = table.scan(**kwargs)
+        for item in response.get('Items', []):
+            base = item.get('local_base') or item['local_id'].split('#', 1)[0]
+            nueva_pk = pedido_pk(base, item['pedido_id'], shards)
+            tenia_base = item.get('local_base') == base
+            item['local_base'] = base
+
+            try:
+                if nueva_pk == item['local_id']:
+                    if tenia_base:
+                        sin_cambios += 1
+                        continue
+                    if not dry_run:
+                        table.update_item(
+                            Key={'local_id': item['local_id'], 'pedido_id': item['pedido_id']},
+                            UpdateExpression='SET local_base = :b',
+                            ExpressionAttributeValues={':b': base},
+                        )
+                    actualizados += 1
+                else:
+                    if not dry_run:
+                        mover(item, nueva_pk)
+                    movidos += 1
+            except ClientError as e:
+                errores += 1
+                print(f"   ❌ {item['local_id']}/{item['pedido_id']}: {e.response['Error']['Code']}")
+
+        if 'LastEvaluatedKey' not in response:
+            break
+        kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+    prefijo = "[dry-run] " if dry_run else ""
+    print(f"\n{prefijo}✅ Movidos: {movidos} | local_base agregado: {actualizados} | "
+          f"sin cambios: {sin_cambios} | errores: {errores}")
+    return errores == 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migra pedidos al esquema local_id#shard")
+    parser.add_argument('--shards', type=int, default=int(os.getenv('PEDIDOS_SHARDS', '1')))
+    parser.add_argument('--dry-run', action='store_true')
+    args = parser.parse_args()
+
+    if not TABLE_PEDIDOS:
+        print("❌ Falta TABLE_PEDIDOS en .env")
+        sys.exit(1)
+
+    print(f"🔀 Migrando {TABLE_PEDIDOS} a {args.shards} shard(s) por local")
+    if not migrar(args.shards, args.dry_run):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
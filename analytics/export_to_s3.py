@@ -26,7 +26,12 @@ def decimal_default(obj):
         return float(obj)
     raise TypeError
 
-def export_table_to_s3(table_name, s3_prefix):
+def _pedido_local_base(item):
+    """Con PEDIDOS_SHARDS > 1 la PK es local_id#shard; Athena agrupa por el local real"""
+    item['local_id'] = item.get('local_base') or item['local_id'].split('#', 1)[0]
+    return item
+
+def export_table_to_s3(table_name, s3_prefix, transform=None):
     """Exporta una tabla de DynamoDB a S3 en formato JSON"""
     print(f"📤 Exportando tabla {table_name}...")
     
@@ -43,6 +48,9 @@ def export_table_to_s3(table_name, s3_prefix):
     
     print(f"   ✅ Total de items: {len(items)}")
     
+    if transform:
+        items = [transform(item) for item in items]
+    
     if len(items) == 0:
         print(f"   ⚠️  No hay datos para exportar en {table_name}")
         return None, 0
@@ -101,7 +109,7 @@ def lambda_handler(event, context):
         
         # Exportar tabla de pedidos
         print("\n1️⃣  Exportando tabla de pedidos...")
-        pedidos_key, pedidos_count = export_table_to_s3(TABLE_PEDIDOS, 'pedidos')
+        pedidos_key, pedidos_count = export_table_to_s3(TABLE_PEDIDOS, 'pedidos', transform=_pedido_local_base)
         
         # Exportar tabla de historial de estados
         print("\n2️⃣  Exportando tabla de historial de estados...")
@@ -4,6 +4,7 @@ from datetime import datetime
 import boto3
 from botocore.exceptions import ClientError
 from auth_helper import get_bearer_token, validate_token_via_lambda
+from pedidos_keys import get_pedido
 
 TABLE_PEDIDOS = os.environ["TABLE_PEDIDOS"]
 TOKENS_TABLE = os.environ.get("TOKENS_TABLE_USERS", "TOKENS_TABLE_USERS")
@@ -66,12 +67,11 @@ def lambda_handler(event, context):
 
     # Leer pedido
     try:
-        r = pedidos_table.get_item(Key={"local_id": local_id, "pedido_id": pedido_id})
+        item = get_pedido(pedidos_table, local_id, pedido_id)
     except ClientError as e:
         print(f"Error get_item pedidos: {e}")
         return _resp(500, {"error": "Error consultando el pedido"})
 
-    item = r.get("Item")
     if not item:
         return _resp(404, {"error": "Pedido no encontrado"})
 
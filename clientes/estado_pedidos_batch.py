@@ -0,0 +1,154 @@
+import os
+import json
+import time
+import boto3
+from botocore.exceptions import ClientError
+from auth_helper import get_bearer_token, validate_token_via_lambda
+from pedidos_keys import PEDIDOS_SHARDS, pedido_key
+
+TABLE_PEDIDOS = os.environ["TABLE_PEDIDOS"]
+TOKENS_TABLE = os.environ.get("TOKENS_TABLE_USERS", "TOKENS_TABLE_USERS")
+
+dynamodb = boto3.resource("dynamodb")
+tokens_table = dynamodb.Table(TOKENS_TABLE)
+
+BATCH_GET_MAX = 100  # límite de claves por BatchGetItem (y por petición)
+MAX_INTENTOS = 5
+# Roles que pueden consultar cualquier pedido (pantallas de call-centre / local)
+ROLES_STAFF = {"Admin", "Gerente", "Cocinero", "Repartidor", "Despachador"}
+
+CORS_HEADERS = {
+    "Access-Control-Allow-Origin": "*",
+    "Access-Control-Allow-Headers": "Content-Type,Authorization",
+    "Access-Control-Allow-Methods": "OPTIONS,POST"
+}
+
+def _resp(code, body):
+    return {
+        "statusCode": code,
+        "headers": {"Content-Type": "application/json", **CORS_HEADERS},
+        "body": json.dumps(body, ensure_ascii=False, default=str)
+    }
+
+def _parse_body(event):
+    body = event.get("body")
+    if isinstance(body, str):
+        return json.loads(body) if body.strip() else {}
+    return body if isinstance(body, dict) else {}
+
+def _get_correo_from_token(token: str):
+    """Obtiene el correo del usuario desde el token en la tabla"""
+    try:
+        response = tokens_table.get_item(Key={'token': token})
+        if 'Item' not in response:
+            return None
+        item = response['Item']
+        return item.get('user_id') or item.get('correo')
+    except Exception:
+        return None
+
+def _validar_claves(pedidos):
+    """Retorna (error, claves únicas en el orden recibido)"""
+    if not isinstance(pedidos, list) or not pedidos:
+        return "pedidos debe ser un array con al menos un item", None
+    claves = {}
+    for i, p in enumerate(pedidos):
+        if not isinstance(p, dict):
+            return f"pedidos[{i}] debe ser objeto", None
+        local_id = p.get("local_id")
+        pedido_id = p.get("pedido_id")
+        if not isinstance(local_id, str) or not local_id.strip() or not isinstance(pedido_id, str) or not pedido_id.strip():
+            return f"pedidos[{i}] requiere local_id y pedido_id", None
+        claves[(local_id.strip(), pedido_id.strip())] = None
+    if len(claves) > BATCH_GET_MAX:
+        return f"Máximo {BATCH_GET_MAX} pedidos por consulta", None
+    return None, list(claves)
+
+def _batch_get_keys(keys):
+    """BatchGetItem proyectado a estado/correo, reintentando UnprocessedKeys con backoff"""
+    request = {TABLE_PEDIDOS: {
+        "Keys": keys,
+        "ProjectionExpression": "local_id, pedido_id, estado, correo",
+    }}
+    items = []
+    for intento in range(MAX_INTENTOS):
+        r = dynamodb.batch_get_item(RequestItems=request)
+        items.extend(r.get("Responses", {}).get(TABLE_PEDIDOS, []))
+        request = r.get("UnprocessedKeys") or None
+        if not request:
+            return items
+        time.sleep(min(0.05 * (2 ** intento), 1.0))
+    raise RuntimeError("No se pudieron leer todos los pedidos (UnprocessedKeys)")
+
+def _batch_get(claves):
+    """Retorna {(local_id, pedido_id): item} usando la PK con shard de cada pedido"""
+    por_pk = {}
+    for local_id, pedido_id in claves:
+        key = pedido_key(local_id, pedido_id)
+        por_pk[(key["local_id"], pedido_id)] = (local_id, pedido_id)
+
+    encontrados = {}
+    for item in _batch_get_keys([{"local_id": pk, "pedido_id": p} for pk, p in por_pk]):
+        encontrados[por_pk[(item["local_id"], item["pedido_id"])]] = item
+
+    # Filas aún no migradas al esquema con shards: segunda pasada con la PK original
+    faltantes = [c for c in claves if c not in encontrados]
+    if PEDIDOS_SHARDS > 1 and faltantes:
+        for item in _batch_get_keys([{"local_id": l, "pedido_id": p} for l, p in faltantes]):
+            encontrados[(item["local_id"], item["pedido_id"])] = item
+    return encontrados
+
+def lambda_handler(event, context):
+    # CORS preflight
+    method = event.get("httpMethod", event.get("requestContext", {}).get("http", {}).get("method"))
+    if method == "OPTIONS":
+        return _resp(200, {"ok": True})
+
+    # Solo POST
+    if method != "POST":
+        return _resp(405, {"error": "Método no permitido"})
+
+    # Validar token mediante Lambda
+    token = get_bearer_token(event)
+    valido, error, rol = validate_token_via_lambda(token)
+    if not valido:
+        return _resp(403, {"error": error or "Token inválido"})
+
+    es_staff = rol in ROLES_STAFF
+    correo_token = None
+    if not es_staff:
+        correo_token = _get_correo_from_token(token)
+        if not correo_token:
+            return _resp(401, {"error": "No se pudo obtener el usuario del token"})
+
+    try:
+        body = _parse_body(event)
+    except json.JSONDecodeError:
+        return _resp(400, {"error": "JSON inválido"})
+    if not isinstance(body, dict):
+        return _resp(400, {"error": "El body debe ser un objeto JSON"})
+
+    msg, claves = _validar_claves(body.get("pedidos"))
+    if msg:
+        return _resp(400, {"error": msg})
+
+    try:
+        encontrados = _batch_get(claves)
+    except (ClientError, RuntimeError) as e:
+        print(f"Error batch_get_item pedidos: {e}")
+        return _resp(500, {"error": "Error consultando los pedidos"})
+
+    # Un resultado por clave, en el orden pedido; la AutZ es por item
+    resultados = []
+    for local_id, pedido_id in claves:
+        item = encontrados.get((local_id, pedido_id))
+        resultado = {"local_id": local_id, "pedido_id": pedido_id}
+        if not item:
+            resultado["error"] = "Pedido no encontrado"
+        elif not es_staff and item.get("correo") != correo_token:
+            resultado["error"] = "No autorizado a consultar este pedido"
+        else:
+            resultado["estado"] = item.get("estado")
+        resultados.append(resultado)
+
+    return _resp(200, {"pedidos": resultados})
@@ -0,0 +1,179 @@
+import os
+import json
+import base64
+from datetime import datetime
+import boto3
+from decimal import Decimal
+from boto3.dynamodb.conditions import Key, Attr
+from botocore.exceptions import ClientError
+from auth_helper import get_bearer_token, validate_token_via_lambda
+from pedidos_keys import local_base
+
+TABLE_PEDIDOS = os.environ["TABLE_PEDIDOS"]
+TOKENS_TABLE = os.environ.get("TOKENS_TABLE_USERS", "TOKENS_TABLE_USERS")
+
+dynamodb = boto3.resource("dynamodb")
+pedidos_table = dynamodb.Table(TABLE_PEDIDOS)
+tokens_table = dynamodb.Table(TOKENS_TABLE)
+
+INDEX_NAME = "by_usuario_v2"  # GSI (correo, created_at)
+# Campos de resumen: el detalle completo sigue en GET /pedido/status
+PROJECTION = "local_id, pedido_id, estado, costo, created_at"
+# Tope de lecturas por petición cuando el filtro de estado descarta muchos items
+MAX_QUERIES = 5
+
+CORS_HEADERS = {
+    "Access-Control-Allow-Origin": "*",
+    "Access-Control-Allow-Headers": "Content-Type,Authorization",
+    "Access-Control-Allow-Methods": "OPTIONS,GET"
+}
+
+def _resp(code, body):
+    return {
+        "statusCode": code,
+        "headers": {"Content-Type": "application/json", **CORS_HEADERS},
+        "body": json.dumps(body, ensure_ascii=False, default=str)
+    }
+
+def _safe_int(v, default):
+    try:
+        return int(v)
+    except Exception:
+        return default
+
+def _convert_decimal(obj):
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, dict):
+        return {k: _convert_decimal(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_convert_decimal(i) for i in obj]
+    return obj
+
+def _get_correo_from_token(token: str):
+    """Obtiene el correo del usuario desde el token en la tabla"""
+    try:
+        response = tokens_table.get_item(Key={'token': token})
+        if 'Item' not in response:
+            return None
+        item = response['Item']
+        return item.get('user_id') or item.get('correo')
+    except Exception:
+        return None
+
+def _encode_token(lek: dict | None) -> str | None:
+    if not lek:
+        return None
+    raw = json.dumps(lek)
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+def _decode_token(tok: str | None) -> dict | None:
+    if not tok:
+        return None
+    try:
+        return json.loads(base64.urlsafe_b64decode(tok.encode("ascii")).decode("utf-8"))
+    except Exception:
+        return None
+
+def _valid_date(value):
+    try:
+        datetime.fromisoformat(value.replace("Z", "+00:00"))
+        return True
+    except ValueError:
+        return False
+
+def _key_condition(correo, desde, hasta):
+    """El rango de fechas va en la key condition sobre created_at (sort key del GSI)"""
+    cond = Key("correo").eq(correo)
+    # created_at es ISO-8601: la comparación de strings respeta el orden temporal.
+    # hasta es inclusivo aunque llegue solo la fecha (YYYY-MM-DD)
+    hasta_max = hasta + "\uffff" if hasta else None
+    if desde and hasta:
+        return cond & Key("created_at").between(desde, hasta_max)
+    if desde:
+        return cond & Key("created_at").gte(desde)
+    if hasta:
+        return cond & Key("created_at").lte(hasta_max)
+    return cond
+
+def lambda_handler(event, context):
+    # CORS preflight
+    method = event.get("httpMethod", event.get("requestContext", {}).get("http", {}).get("method"))
+    if method == "OPTIONS":
+        return _resp(200, {"ok": True})
+
+    # Solo GET
+    if method != "GET":
+        return _resp(405, {"error": "Método no permitido"})
+
+    # Validar token mediante Lambda
+    token = get_bearer_token(event)
+    valido, error, rol = validate_token_via_lambda(token)
+    if not valido:
+        return _resp(403, {"error": error or "Token inválido"})
+
+    # El historial es siempre del usuario del token
+    correo = _get_correo_from_token(token)
+    if not correo:
+        return _resp(401, {"error": "No se pudo obtener el usuario del token"})
+
+    qs = event.get("queryStringParameters") or {}
+    size = _safe_int(qs.get("size", 10), 10)
+    if size <= 0 or size > 50:
+        size = 10
+
+    estado = (qs.get("estado") or "").strip() or None
+    desde = (qs.get("desde") or "").strip() or None
+    hasta = (qs.get("hasta") or "").strip() or None
+    for nombre, valor in (("desde", desde), ("hasta", hasta)):
+        if valor and not _valid_date(valor):
+            return _resp(400, {"error": f"{nombre} debe ser una fecha ISO-8601"})
+
+    next_token_in = qs.get("next_token")
+    lek = _decode_token(next_token_in)
+    if next_token_in and (not lek or lek.get("correo") != correo):
+        return _resp(400, {"error": "next_token inválido"})
+
+    qargs = {
+        "IndexName": INDEX_NAME,
+        "KeyConditionExpression": _key_condition(correo, desde, hasta),
+        "ProjectionExpression": PROJECTION,
+        "ScanIndexForward": False,  # más recientes primero
+        "Limit": size,
+    }
+    # estado no forma parte de la clave del GSI: se filtra sobre lo ya leído por la query
+    if estado:
+        qargs["FilterExpression"] = Attr("estado").eq(estado)
+
+    pedidos = []
+    try:
+        for _ in range(MAX_QUERIES):
+            if lek:
+                qargs["ExclusiveStartKey"] = lek
+            r = pedidos_table.query(**qargs)
+            pedidos.extend(r.get("Items", []))
+            lek = r.get("LastEvaluatedKey")
+            if len(pedidos) >= size or not lek:
+                break
+    except ClientError as e:
+        print(f"Error query {INDEX_NAME}: {e}")
+        return _resp(500, {"error": "Error consultando el historial"})
+
+    if len(pedidos) > size:
+        # Se cortó en medio de una página: el cursor arranca después del último devuelto
+        pedidos = pedidos[:size]
+        ultimo = pedidos[-1]
+        lek = {
+            "correo": correo,
+            "created_at": ultimo["created_at"],
+            "local_id": ultimo["local_id"],
+            "pedido_id": ultimo["pedido_id"],
+        }
+
+    # El cursor guarda la PK tal cual; al cliente se le devuelve el local sin shard
+    resumen = [dict(p, local_id=local_base(p["local_id"])) for p in pedidos]
+    return _resp(200, {
+        "pedidos": _convert_decimal(resumen),
+        "size": size,
+        "next_token": _encode_token(lek),
+    })
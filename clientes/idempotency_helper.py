@@ -0,0 +1,129 @@
+import os
+import json
+import time
+import hashlib
+import uuid
+import boto3
+from boto3.dynamodb.types import TypeDeserializer
+from botocore.exceptions import ClientError
+
+TABLE_IDEMPOTENCIA = os.environ.get("TABLE_IDEMPOTENCIA", "")
+# Cuánto se recuerda una respuesta (TTL de DynamoDB sobre expires_at)
+IDEMPOTENCY_TTL_SECONDS = int(os.environ.get("IDEMPOTENCY_TTL_SECONDS", "86400"))
+# Una reserva EN_PROCESO más vieja que esto se considera abandonada (> timeout del Lambda)
+IDEMPOTENCY_LOCK_SECONDS = int(os.environ.get("IDEMPOTENCY_LOCK_SECONDS", "30"))
+
+dynamodb = boto3.resource("dynamodb")
+idempotencia_table = dynamodb.Table(TABLE_IDEMPOTENCIA) if TABLE_IDEMPOTENCIA else None
+
+
+def get_idempotency_key(event):
+    """Extrae el header Idempotency-Key (case-insensitive). None si la tabla no está configurada."""
+    if idempotencia_table is None:
+        return None
+    headers = event.get("headers") or {}
+    for key, value in headers.items():
+        if key.lower() == "idempotency-key" and isinstance(value, str) and value.strip():
+            return value.strip()
+    return None
+
+
+def payload_fingerprint(body):
+    """Huella del body: la misma key con otro payload es un error del cliente"""
+    raw = json.dumps(body, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def reservar(scope, key, fingerprint):
+    """
+    Reserva la key antes de ejecutar la operación.
+
+    Retorna (estado, registro):
+        ("NUEVO", reserva_id)    -> ejecutar la operación junto con respuesta_en_transaccion(reserva_id)
+        ("REPETIDO", registro)   -> devolver registro["status_code"] / registro["body"]
+        ("EN_PROCESO", None)     -> otra petición con la misma key sigue en curso
+        ("CONFLICTO", None)      -> misma key con un payload distinto
+    """
+    id_key = f"{scope}#{key}"
+    now = int(time.time())
+    # Identifica esta reserva: si el lock vence y otra petición la toma, la nuestra ya no puede completar
+    reserva_id = str(uuid.uuid4())
+    try:
+        idempotencia_table.put_item(
+            Item={
+                "idempotency_key": id_key,
+                "estado": "EN_PROCESO",
+                "fingerprint": fingerprint,
+                "reserva_id": reserva_id,
+                "locked_until": now + IDEMPOTENCY_LOCK_SECONDS,
+                "expires_at": now + IDEMPOTENCY_TTL_SECONDS,
+            },
+            # Libre, reserva abandonada, o expirada pero aún no borrada por el TTL
+            ConditionExpression=(
+                "attribute_not_exists(idempotency_key)"
+                " OR (estado = :en_proceso AND locked_until < :now)"
+                " OR expires_at < :now"
+            ),
+            ExpressionAttributeValues={":en_proceso": "EN_PROCESO", ":now": now},
+            ReturnValuesOnConditionCheckFailure="ALL_OLD",
+        )
+        return "NUEVO", reserva_id
+    except ClientError as e:
+        if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+            raise
+        registro = e.response.get("Item")
+
+    if registro is None:
+        registro = idempotencia_table.get_item(
+            Key={"idempotency_key": id_key}, ConsistentRead=True
+        ).get("Item") or {}
+    else:
+        # ReturnValuesOnConditionCheckFailure devuelve el item en formato DynamoDB JSON
+        deserializer = TypeDeserializer()
+        registro = {k: deserializer.deserialize(v) for k, v in registro.items()}
+
+    if registro.get("fingerprint") != fingerprint:
+        return "CONFLICTO", None
+    if registro.get("estado") == "COMPLETADO":
+        return "REPETIDO", registro
+    return "EN_PROCESO", None
+
+
+def respuesta_en_transaccion(scope, key, reserva_id, status_code, body):
+    """
+    Item de TransactWriteItems que marca la key COMPLETADO con la respuesta.
+    Va en la misma transacción que la escritura del pedido: o quedan ambos o ninguno,
+    así una reserva nunca queda EN_PROCESO (y reclamable) con un pedido ya creado.
+    Falla si la reserva ya no es la nuestra (lock vencido y tomado por otro reintento).
+    """
+    return {
+        "Update": {
+            "TableName": TABLE_IDEMPOTENCIA,
+            "Key": {"idempotency_key": f"{scope}#{key}"},
+            "UpdateExpression": "SET estado = :c, status_code = :s, #body = :b REMOVE locked_until",
+            "ConditionExpression": "estado = :en_proceso AND reserva_id = :r",
+            "ExpressionAttributeNames": {"#body": "body"},
+            "ExpressionAttributeValues": {
+                ":c": "COMPLETADO",
+                ":s": status_code,
+                ":b": json.dumps(body, ensure_ascii=False, default=str),
+                ":en_proceso": "EN_PROCESO",
+                ":r": reserva_id,
+            },
+        }
+    }
+
+
+def liberar(scope, key, reserva_id):
+    """
+    Suelta la reserva cuando la operación falló y el cliente debe poder reintentar.
+    Solo si sigue siendo la nuestra: con el lock vencido, otro reintento pudo tomarla.
+    """
+    try:
+        idempotencia_table.delete_item(
+            Key={"idempotency_key": f"{scope}#{key}"},
+            ConditionExpression="estado = :en_proceso AND reserva_id = :r",
+            ExpressionAttributeValues={":en_proceso": "EN_PROCESO", ":r": reserva_id},
+        )
+    except ClientError as e:
+        print(f"Error liberando idempotency key: {e}")
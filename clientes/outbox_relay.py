@@ -0,0 +1,105 @@
+import os
+import json
+import time
+import boto3
+from boto3.dynamodb.types import TypeDeserializer
+from botocore.exceptions import ClientError
+
+# ==== Variables de entorno ====
+TABLE_PEDIDOS = os.environ["TABLE_PEDIDOS"]
+EVENT_BUS_NAME = os.environ.get("EVENT_BUS_NAME", "default")
+OUTBOX_MAX_INTENTOS = int(os.environ.get("OUTBOX_MAX_INTENTOS", "3"))
+
+# ==== Clientes AWS ====
+dynamodb = boto3.resource("dynamodb")
+pedidos_table = dynamodb.Table(TABLE_PEDIDOS)
+eventbridge = boto3.client("events")
+
+PUT_EVENTS_MAX = 10  # límite de entradas por put_events
+
+_deserializer = TypeDeserializer()
+
+
+def _deserialize(image):
+    return {k: _deserializer.deserialize(v) for k, v in (image or {}).items()}
+
+
+def _pendientes(records):
+    """Registros del stream cuyo NewImage aún tiene el evento sin publicar"""
+    pendientes = []
+    for record in records:
+        if record.get("eventName") not in ("INSERT", "MODIFY"):
+            continue
+        nuevo = _deserialize(record["dynamodb"].get("NewImage"))
+        if nuevo.get("outbox_estado") != "PENDIENTE" or not nuevo.get("outbox_evento"):
+            continue
+        entry = json.loads(nuevo["outbox_evento"])
+        entry["EventBusName"] = EVENT_BUS_NAME
+        pendientes.append({
+            "seq": record["dynamodb"]["SequenceNumber"],
+            "key": {"local_id": nuevo["local_id"], "pedido_id": nuevo["pedido_id"]},
+            "entry": entry,
+        })
+    return pendientes
+
+
+def _publicar(pendientes):
+    """
+    Publica en lotes de 10, reintentando solo las entradas fallidas con backoff.
+    Retorna (publicados, fallidos).
+    """
+    publicados, fallidos = [], []
+    for i in range(0, len(pendientes), PUT_EVENTS_MAX):
+        lote = pendientes[i:i + PUT_EVENTS_MAX]
+        for intento in range(OUTBOX_MAX_INTENTOS):
+            try:
+                resp = eventbridge.put_events(Entries=[p["entry"] for p in lote])
+            except ClientError as e:
+                print(f"Error put_events (intento {intento + 1}): {e}")
+                resp = None
+            if resp is not None:
+                reintentar = []
+                for p, res in zip(lote, resp.get("Entries", [])):
+                    if res.get("ErrorCode"):
+                        print(f"Entrada rechazada {p['key']}: {res.get('ErrorCode')} {res.get('ErrorMessage')}")
+                        reintentar.append(p)
+                    else:
+                        publicados.append(p)
+                lote = reintentar
+            if not lote:
+                break
+            time.sleep(0.1 * (2 ** intento))
+        fallidos.extend(lote)
+    return publicados, fallidos
+
+
+def _marcar_publicado(key):
+    """Limpia la marca del outbox; el MODIFY resultante ya no pasa el filtro del stream"""
+    try:
+        pedidos_table.update_item(
+            Key=key,
+            UpdateExpression="REMOVE outbox_estado, outbox_evento SET outbox_publicado_at = :t",
+            ConditionExpression="outbox_estado = :p",
+            ExpressionAttributeValues={":p": "PENDIENTE", ":t": int(time.time())},
+        )
+    except ClientError as e:
+        if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+            print(f"Error limpiando outbox de {key}: {e}")
+
+
+def lambda_handler(event, context):
+    """
+    Relay del outbox de pedidos (stream de la tabla PEDIDOS).
+    Entrega al menos una vez: un reintento del lote puede republicar un evento ya enviado;
+    el consumidor (start_execution) debe tolerar duplicados.
+    """
+    pendientes = _pendientes(event.get("Records", []))
+    if not pendientes:
+        return {"batchItemFailures": []}
+
+    publicados, fallidos = _publicar(pendientes)
+    for p in publicados:
+        _marcar_publicado(p["key"])
+
+    print(json.dumps({"publicados": len(publicados), "fallidos": len(fallidos)}))
+    return {"batchItemFailures": [{"itemIdentifier": p["seq"]} for p in fallidos]}
@@ -7,21 +7,28 @@ import boto3
 from botocore.exceptions import ClientError
 from decimal import Decimal
 from auth_helper import get_bearer_token, validate_token_via_lambda
+from idempotency_helper import (
+    get_idempotency_key, payload_fingerprint, reservar, respuesta_en_transaccion, liberar
+)
+from product_cache import get_product_cache
+from pedidos_keys import pedido_pk, local_estado
 
 # ==== Variables de entorno ====
 TABLE_PEDIDOS = os.environ["TABLE_PEDIDOS"]
 TOKENS_TABLE_USERS = os.environ["TOKENS_TABLE_USERS"]
+TABLE_PRODUCTOS = os.environ["TABLE_PRODUCTOS"]
 
 # ==== Clientes AWS ====
 dynamodb = boto3.resource("dynamodb")
 pedidos_table = dynamodb.Table(TABLE_PEDIDOS)
 tokens_table = dynamodb.Table(TOKENS_TABLE_USERS)
 lambda_client = boto3.client("lambda")
-eventbridge = boto3.client("events")  # bus por defecto
+# Catálogo: LRU caliente por contenedor + BatchGetItem para lo que falte
+catalogo = get_product_cache(TABLE_PRODUCTOS)
 
 CORS_HEADERS = {
     "Access-Control-Allow-Origin": "*",
-    "Access-Control-Allow-Headers": "Content-Type,Authorization",
+    "Access-Control-Allow-Headers": "Content-Type,Authorization,Idempotency-Key",
     "Access-Control-Allow-Methods": "OPTIONS,POST"
 }
 
@@ -32,6 +39,14 @@ def _resp(code, body):
         "body": json.dumps(body, ensure_ascii=False, default=str)
     }
 
+def _replay(registro):
+    """Respuesta guardada de la primera ejecución con la misma Idempotency-Key"""
+    return {
+        "statusCode": int(registro["status_code"]),
+        "headers": {"Content-Type": "application/json", "Idempotent-Replayed": "true", **CORS_HEADERS},
+        "body": registro["body"]
+    }
+
 def _parse_body(event):
     body = event.get("body")
     if isinstance(body, str):
@@ -41,7 +56,8 @@ def _parse_body(event):
     return body
 
 def _validate_payload(p):
-    required = ["local_id","direccion","costo"]
+    # costo ya no es requerido: el total se calcula en el servidor desde el catálogo
+    required = ["local_id","direccion"]
     missing = [k for k in required if k not in p]
     if missing:
         return False, f"Faltan campos requeridos: {', '.join(missing)}"
@@ -50,7 +66,7 @@ def _validate_payload(p):
         return False, "local_id debe ser string"
     if not isinstance(p["direccion"], str) or not p["direccion"].strip():
         return False, "dirección debe ser string"
-    if not (isinstance(p["costo"], int) or isinstance(p["costo"], float)) or p["costo"] < 0:
+    if "costo" in p and (not isinstance(p["costo"], (int, float)) or p["costo"] < 0):
         return False, "costo debe ser number >= 0"
 
     if "productos" not in p or p["productos"] is None:
@@ -67,6 +83,43 @@ def _validate_payload(p):
 
     return True, None
 
+def _cotizar(local_id, productos):
+    """
+    Precio del pedido contra el catálogo del local (una sola lectura batch).
+    Retorna (codigo_error, mensaje, lineas, total); codigo_error es None si todo está OK.
+    """
+    cantidades = {}
+    for it in productos:
+        cantidades[it["producto_id"]] = cantidades.get(it["producto_id"], 0) + it["cantidad"]
+
+    catalogo_local = catalogo.get_many(local_id, list(cantidades))
+
+    desconocidos = [pid for pid in cantidades if pid not in catalogo_local]
+    if desconocidos:
+        return 400, f"Productos inexistentes en {local_id}: {', '.join(desconocidos)}", None, None
+
+    sin_stock = [
+        pid for pid, cant in cantidades.items()
+        if catalogo_local[pid].get("stock") is not None and catalogo_local[pid]["stock"] < cant
+    ]
+    if sin_stock:
+        return 409, f"Productos sin stock suficiente: {', '.join(sin_stock)}", None, None
+
+    lineas, total = [], Decimal("0")
+    for it in productos:
+        prod = catalogo_local[it["producto_id"]]
+        precio = Decimal(str(prod["precio"]))
+        subtotal = precio * it["cantidad"]
+        total += subtotal
+        lineas.append({
+            "producto_id": it["producto_id"],
+            "nombre": prod.get("nombre"),
+            "cantidad": it["cantidad"],
+            "precio_unitario": precio,
+            "subtotal": subtotal
+        })
+    return None, None, lineas, total
+
 def _get_correo_from_token(token: str):
     """Obtiene el correo del usuario desde el token en la tabla"""
     try:
@@ -81,7 +134,11 @@ def _get_correo_from_token(token: str):
 def _now_iso():
     return datetime.now(timezone.utc).isoformat()
 
-def _publish_crear_pedido_event(item):
+def _crear_pedido_outbox(item):
+    """
+    Evento CrearPedido serializado para el outbox.
+    Se guarda junto al pedido (misma escritura) y lo publica outbox_relay desde el stream.
+    """
     productos_simple = [
         {"nombre": p.get("nombre"), "cantidad": p.get("cantidad")}
         for p in item.get("productos", [])
@@ -89,17 +146,14 @@ def _publish_crear_pedido_event(item):
     ]
     detail = {
         "pedido_id": item["pedido_id"],
-        "local_id": item["local_id"],
+        "local_id": item["local_base"],
         "productos": productos_simple
     }
-    try:
-        eventbridge.put_events(Entries=[{
-            "Source": "200millas.pedidos",
-            "DetailType": "CrearPedido",
-            "Detail": json.dumps(detail, ensure_ascii=False)
-        }])
-    except Exception as e:
-        print(f"Error publicando evento CrearPedido: {e}")
+    return json.dumps({
+        "Source": "200millas.pedidos",
+        "DetailType": "CrearPedido",
+        "Detail": json.dumps(detail, ensure_ascii=False, default=str)
+    }, ensure_ascii=False)
 
 def lambda_handler(event, context):
     # Preflight CORS
@@ -129,35 +183,96 @@ def lambda_handler(event, context):
     if not ok:
         return _resp(400, {"error": msg})
 
+    # Idempotencia: un reintento con la misma key devuelve la primera respuesta
+    # sin volver a escribir en PEDIDOS ni publicar en EventBridge
+    idem_key = get_idempotency_key(event)
+    if idem_key:
+        try:
+            estado_idem, registro = reservar(correo_token, idem_key, payload_fingerprint(body))
+            reserva_id = registro if estado_idem == "NUEVO" else None
+        except ClientError as e:
+            print(f"Error reservando idempotency key: {e}")
+            return _resp(500, {"error": "Error registrando la Idempotency-Key"})
+        if estado_idem == "REPETIDO":
+            return _replay(registro)
+        if estado_idem == "EN_PROCESO":
+            return _resp(409, {"error": "Hay una petición en curso con la misma Idempotency-Key"})
+        if estado_idem == "CONFLICTO":
+            return _resp(422, {"error": "La Idempotency-Key ya se usó con un payload distinto"})
+
+    # Precio y existencia de productos calculados en el servidor
+    try:
+        codigo, msg, lineas, total = _cotizar(body["local_id"], body["productos"])
+    except (ClientError, RuntimeError) as e:
+        if idem_key:
+            liberar(correo_token, idem_key, reserva_id)
+        print(f"Error leyendo catálogo: {e}")
+        return _resp(500, {"error": "Error consultando el catálogo"})
+    if codigo:
+        if idem_key:
+            liberar(correo_token, idem_key, reserva_id)
+        return _resp(codigo, {"error": msg})
+
     # Generar ID y timestamps
     pedido_id = str(uuid.uuid4())
     now_iso = _now_iso()
 
     # Construir item con nueva estructura
     item = {
-        "local_id": body["local_id"],                           # PK (cambió de tenant_id)
+        "local_id": pedido_pk(body["local_id"], pedido_id),     # PK (local_id o local_id#shard)
         "pedido_id": pedido_id,                                  # SK
+        "local_base": body["local_id"],                          # local real (sin shard)
         "correo": correo_token,                       # GSI by_usuario_v2 (solo correo)
-        "productos": body["productos"],                         # Ahora usa producto_id
-        "costo": Decimal(str(body["costo"])),
+        "productos": lineas,                                     # producto_id + precio del catálogo
+        "costo": total,                                          # Calculado en el servidor
         "direccion": body["direccion"],
         "estado": "procesando",                                  # Estado inicial por defecto
-        "created_at": now_iso                                    # Nuevo campo requerido
+        "local_estado": local_estado(body["local_id"], "procesando"),  # GSI by_local_estado
+        "created_at": now_iso,                                   # Nuevo campo requerido
+        "updated_at": now_iso                                    # GSI by_local_updated (delta-sync)
     }
+    # Outbox: el evento viaja en la misma escritura; outbox_relay lo publica y limpia la marca
+    item["outbox_estado"] = "PENDIENTE"
+    item["outbox_evento"] = _crear_pedido_outbox(item)
+
+    # El evento CrearPedido sale por el outbox (stream -> outbox_relay): no se espera a EventBridge
+    pedido = {k: v for k, v in item.items() if not k.startswith("outbox_")}
+    pedido["local_id"] = pedido.pop("local_base")
+    pedido.pop("local_estado", None)
+    respuesta = {"message": "Pedido registrado", "pedido": pedido}
 
-    # Persistir en DynamoDB (unicidad por PK compuesta)
+    # Persistir en DynamoDB (unicidad por PK compuesta). Con Idempotency-Key el pedido y la
+    # respuesta guardada se escriben en una sola transacción
+    put_pedido = {
+        "TableName": TABLE_PEDIDOS,
+        "Item": item,
+        "ConditionExpression": "attribute_not_exists(local_id) AND attribute_not_exists(pedido_id)"
+    }
     try:
-        pedidos_table.put_item(
-            Item=item,
-            ConditionExpression="attribute_not_exists(local_id) AND attribute_not_exists(pedido_id)"
-        )
+        if idem_key:
+            dynamodb.meta.client.transact_write_items(TransactItems=[
+                {"Put": put_pedido},
+                respuesta_en_transaccion(correo_token, idem_key, reserva_id, 201, respuesta),
+            ])
+        else:
+            pedidos_table.put_item(
+                Item=item,
+                ConditionExpression=put_pedido["ConditionExpression"]
+            )
     except ClientError as e:
-        if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
+        codigo = e.response["Error"]["Code"]
+        if codigo == "TransactionCanceledException":
+            razones = [r.get("Code", "None") for r in e.response.get("CancellationReasons", [])]
+            if len(razones) > 1 and razones[1] == "ConditionalCheckFailed":
+                # La reserva venció y otro reintento con la misma key la tomó: ese crea el pedido
+                return _resp(409, {"error": "Hay una petición en curso con la misma Idempotency-Key"})
+            if razones and razones[0] == "ConditionalCheckFailed":
+                codigo = "ConditionalCheckFailedException"
+        if idem_key:
+            liberar(correo_token, idem_key, reserva_id)
+        if codigo == "ConditionalCheckFailedException":
             return _resp(409, {"error": "El pedido ya existe (local_id, pedido_id)"})
-        print(f"Error put_item: {e}")
+        print(f"Error guardando pedido: {e}")
         return _resp(500, {"error": "Error guardando el pedido"})
 
-    # Publicar evento
-    _publish_crear_pedido_event(item)
-
-    return _resp(201, {"message": "Pedido registrado", "pedido": item})
+    return _resp(201, respuesta)
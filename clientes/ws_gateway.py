@@ -0,0 +1,49 @@
+import json
+import boto3
+from botocore.exceptions import ClientError
+
+
+class ApiGatewayManagementGateway:
+    """Envía mensajes a conexiones WebSocket vía API Gateway Management API."""
+
+    def __init__(self, endpoint_url):
+        self._client = boto3.client("apigatewaymanagementapi", endpoint_url=endpoint_url)
+
+    def post(self, connection_id, data):
+        """Retorna False si la conexión ya no existe (GoneException)."""
+        try:
+            self._client.post_to_connection(
+                ConnectionId=connection_id,
+                Data=json.dumps(data, ensure_ascii=False, default=str).encode("utf-8"),
+            )
+            return True
+        except ClientError as e:
+            if e.response["Error"]["Code"] in ("GoneException", "410"):
+                return False
+            raise
+
+
+class InMemoryGateway:
+    """Sustituto local del gateway: guarda los mensajes por conexión (pruebas / ejecución local)."""
+
+    def __init__(self, connections=None):
+        self.connections = set(connections or [])
+        self.sent = {}
+
+    def connect(self, connection_id):
+        self.connections.add(connection_id)
+
+    def disconnect(self, connection_id):
+        self.connections.discard(connection_id)
+
+    def post(self, connection_id, data):
+        if connection_id not in self.connections:
+            return False
+        self.sent.setdefault(connection_id, []).append(data)
+        return True
+
+
+def gateway_from_event(event):
+    """Gateway para responder en la misma API que invocó al Lambda ($connect / rutas)."""
+    ctx = event.get("requestContext", {})
+    return ApiGatewayManagementGateway(f"https://{ctx['domainName']}/{ctx['stage']}")
@@ -0,0 +1,132 @@
+import os
+import json
+import time
+import boto3
+from botocore.exceptions import ClientError
+from auth_helper import validate_token_via_lambda
+from ws_gateway import gateway_from_event
+from pedidos_keys import get_pedido
+
+TABLE_PEDIDOS = os.environ["TABLE_PEDIDOS"]
+TABLE_WS_CONEXIONES = os.environ["TABLE_WS_CONEXIONES"]
+TABLE_WS_SUSCRIPCIONES = os.environ["TABLE_WS_SUSCRIPCIONES"]
+TOKENS_TABLE = os.environ.get("TOKENS_TABLE_USERS", "TOKENS_TABLE_USERS")
+# API Gateway corta las conexiones WebSocket a las 2 horas
+WS_TTL_SECONDS = int(os.environ.get("WS_TTL_SECONDS", "7200"))
+
+dynamodb = boto3.resource("dynamodb")
+pedidos_table = dynamodb.Table(TABLE_PEDIDOS)
+conexiones_table = dynamodb.Table(TABLE_WS_CONEXIONES)
+suscripciones_table = dynamodb.Table(TABLE_WS_SUSCRIPCIONES)
+tokens_table = dynamodb.Table(TOKENS_TABLE)
+
+# Roles que pueden seguir cualquier pedido (no solo los propios)
+ROLES_STAFF = {"Admin", "Gerente", "Cocinero", "Repartidor", "Despachador"}
+
+
+def _resp(code, body=None):
+    return {"statusCode": code, "body": json.dumps(body or {}, ensure_ascii=False, default=str)}
+
+
+def _get_correo_from_token(token: str):
+    """Obtiene el correo del usuario desde el token en la tabla"""
+    try:
+        response = tokens_table.get_item(Key={'token': token})
+        if 'Item' not in response:
+            return None
+        item = response['Item']
+        return item.get('user_id') or item.get('correo')
+    except Exception:
+        return None
+
+
+def connect(event, context):
+    """
+    $connect: el navegador no puede mandar headers en un WebSocket,
+    así que el token llega por querystring (?token=...).
+    """
+    connection_id = event["requestContext"]["connectionId"]
+    qs = event.get("queryStringParameters") or {}
+    token = (qs.get("token") or "").strip()
+
+    valido, error, rol = validate_token_via_lambda(token)
+    if not valido:
+        return _resp(403, {"error": error or "Token inválido"})
+
+    correo = _get_correo_from_token(token)
+    if not correo:
+        return _resp(401, {"error": "No se pudo obtener el usuario del token"})
+
+    now = int(time.time())
+    conexiones_table.put_item(Item={
+        "connection_id": connection_id,
+        "correo": correo,
+        "rol": rol or "Cliente",
+        "connected_at": now,
+        "expires_at": now + WS_TTL_SECONDS,
+    })
+    return _resp(200)
+
+
+def disconnect(event, context):
+    """$disconnect: borra la conexión y sus suscripciones"""
+    connection_id = event["requestContext"]["connectionId"]
+    try:
+        r = conexiones_table.get_item(Key={"connection_id": connection_id})
+        pedidos = (r.get("Item") or {}).get("pedidos") or set()
+        for pedido_id in pedidos:
+            suscripciones_table.delete_item(Key={"pedido_id": pedido_id, "connection_id": connection_id})
+        conexiones_table.delete_item(Key={"connection_id": connection_id})
+    except ClientError as e:
+        # Lo que quede lo limpia el TTL o el pusher al recibir GoneException
+        print(f"Error limpiando conexión {connection_id}: {e}")
+    return _resp(200)
+
+
+def suscribir(event, context):
+    """
+    Ruta "suscribir": {"action": "suscribir", "local_id": "...", "pedido_id": "..."}
+    Registra la suscripción y envía el estado actual para no depender de un GET previo.
+    """
+    connection_id = event["requestContext"]["connectionId"]
+    try:
+        body = json.loads(event.get("body") or "{}")
+    except json.JSONDecodeError:
+        return _resp(400, {"error": "JSON inválido"})
+
+    local_id = (body.get("local_id") or "").strip()
+    pedido_id = (body.get("pedido_id") or "").strip()
+    if not local_id or not pedido_id:
+        return _resp(400, {"error": "Faltan local_id y/o pedido_id"})
+
+    conexion = conexiones_table.get_item(Key={"connection_id": connection_id}).get("Item")
+    if not conexion:
+        return _resp(403, {"error": "Conexión no registrada"})
+
+    pedido = get_pedido(pedidos_table, local_id, pedido_id)
+    if not pedido:
+        return _resp(404, {"error": "Pedido no encontrado"})
+
+    # AutZ: igual que GET /pedido/status, el cliente solo sigue sus pedidos
+    if conexion.get("rol") not in ROLES_STAFF and pedido.get("correo") != conexion.get("correo"):
+        return _resp(403, {"error": "No autorizado a seguir este pedido"})
+
+    suscripciones_table.put_item(Item={
+        "pedido_id": pedido_id,
+        "connection_id": connection_id,
+        "local_id": local_id,
+        "expires_at": int(conexion["expires_at"]),
+    })
+    conexiones_table.update_item(
+        Key={"connection_id": connection_id},
+        UpdateExpression="ADD pedidos :p",
+        ExpressionAttributeValues={":p": {pedido_id}},
+    )
+
+    gateway_from_event(event).post(connection_id, {
+        "tipo": "estado",
+        "local_id": local_id,
+        "pedido_id": pedido_id,
+        "estado": pedido.get("estado"),
+    })
+    return _resp(200)
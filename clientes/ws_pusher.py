@@ -0,0 +1,100 @@
+import os
+import json
+import boto3
+from boto3.dynamodb.conditions import Key
+from boto3.dynamodb.types import TypeDeserializer
+from ws_gateway import ApiGatewayManagementGateway, InMemoryGateway
+from pedidos_keys import local_base
+
+TABLE_WS_SUSCRIPCIONES = os.environ["TABLE_WS_SUSCRIPCIONES"]
+# https://{api_id}.execute-api.{region}.amazonaws.com/{stage}; vacío = gateway en memoria
+WS_ENDPOINT = os.environ.get("WS_ENDPOINT", "")
+
+dynamodb = boto3.resource("dynamodb")
+suscripciones_table = dynamodb.Table(TABLE_WS_SUSCRIPCIONES)
+
+_deserializer = TypeDeserializer()
+_gateway = None
+
+
+def get_gateway():
+    global _gateway
+    if _gateway is None:
+        _gateway = ApiGatewayManagementGateway(WS_ENDPOINT) if WS_ENDPOINT else InMemoryGateway()
+    return _gateway
+
+
+def set_gateway(gateway):
+    """Permite inyectar un InMemoryGateway al ejecutar localmente"""
+    global _gateway
+    _gateway = gateway
+
+
+def _deserialize(image):
+    return {k: _deserializer.deserialize(v) for k, v in (image or {}).items()}
+
+
+def _cambios_de_estado(records):
+    """MODIFY del stream de PEDIDOS donde cambió el atributo estado"""
+    cambios = []
+    for record in records:
+        if record.get("eventName") != "MODIFY":
+            continue
+        viejo = _deserialize(record["dynamodb"].get("OldImage"))
+        nuevo = _deserialize(record["dynamodb"].get("NewImage"))
+        if not nuevo.get("estado") or viejo.get("estado") == nuevo.get("estado"):
+            continue
+        cambios.append((record["dynamodb"]["SequenceNumber"], nuevo))
+    return cambios
+
+
+def _suscriptores(pedido_id):
+    kwargs = {
+        "KeyConditionExpression": Key("pedido_id").eq(pedido_id),
+        "ProjectionExpression": "connection_id",
+    }
+    while True:
+        r = suscripciones_table.query(**kwargs)
+        for item in r.get("Items", []):
+            yield item["connection_id"]
+        if "LastEvaluatedKey" not in r:
+            break
+        kwargs["ExclusiveStartKey"] = r["LastEvaluatedKey"]
+
+
+def notificar(pedido):
+    """Empuja el nuevo estado a cada conexión suscrita; limpia las que ya no existen"""
+    gateway = get_gateway()
+    mensaje = {
+        "tipo": "estado",
+        "local_id": local_base(pedido["local_id"]),
+        "pedido_id": pedido["pedido_id"],
+        "estado": pedido["estado"],
+    }
+    enviados = 0
+    for connection_id in _suscriptores(pedido["pedido_id"]):
+        if gateway.post(connection_id, mensaje):
+            enviados += 1
+        else:
+            suscripciones_table.delete_item(
+                Key={"pedido_id": pedido["pedido_id"], "connection_id": connection_id}
+            )
+    return enviados
+
+
+def lambda_handler(event, context):
+    """
+    Consumidor del stream de PEDIDOS: cada transición que escriben los handlers
+    del stepFunction (update_pedido_estado) llega aquí y se empuja por WebSocket.
+    """
+    failures = []
+    enviados = 0
+    for seq, pedido in _cambios_de_estado(event.get("Records", [])):
+        try:
+            enviados += notificar(pedido)
+        except Exception as e:
+            print(f"Error notificando pedido {pedido.get('pedido_id')}: {e}")
+            failures.append({"itemIdentifier": seq})
+
+    print(json.dumps({"mensajes_enviados": enviados, "fallidos": len(failures)}))
+    return {"batchItemFailures": failures}
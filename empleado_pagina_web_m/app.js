@@ -5,6 +5,9 @@ let allOrders = [];
 let currentFilter = 'todos';
 let selectedOrder = null;
 let isAdmin = false;
+let ordersCursor = null;  // updated_at del último cambio recibido (delta-sync)
+// pedido_id -> empleado_id de los pedidos en cocina / en camino (heartbeat); en localStorage para sobrevivir a recargas
+const workingOrders = new Map(JSON.parse(localStorage.getItem('workingOrders') || '[]'));
 
 // ==================== DOM Elements ====================
 const loginSection = document.getElementById('loginSection');
@@ -299,6 +302,14 @@ function handleLogout() {
     currentUser = null;
     isAdmin = false;
     allOrders = [];
+    ordersCursor = null;
+    workingOrders.clear();  // sin sesión no hay heartbeat: los pedidos en curso se reasignan
+    localStorage.removeItem('workingOrders');
+    
+    // Cortar el seguimiento de estado (WebSocket o polling)
+    followedOrderId = null;
+    stopStatusPolling();
+    if (statusSocket) statusSocket.close();
     
     localStorage.removeItem('authToken');
     localStorage.removeItem('currentUser');
@@ -352,8 +363,52 @@ function showMainContent() {
 }
 
 // ==================== Orders Management ====================
+// Delta-sync: solo se piden los pedidos modificados desde ordersCursor
 async function loadOrders() {
-    // No hacer nada, los empleados usan los formularios directamente
+    let nextToken = null;
+    try {
+        do {
+            const params = new URLSearchParams({ local_id: API_CONFIG.localId });
+            if (nextToken) {
+                params.set('next_token', nextToken);
+            } else if (ordersCursor) {
+                params.set('cursor', ordersCursor);
+            }
+            
+            const response = await fetch(
+                `${API_CONFIG.empleadoUrl}${API_CONFIG.endpoints.pedidosCambios}?${params}`
+            );
+            if (!response.ok) {
+                throw new Error('Error al sincronizar pedidos');
+            }
+            
+            const data = await response.json();
+            mergeOrders(data.pedidos || []);
+            // Las páginas vienen en orden de updated_at: el último cursor es el más reciente
+            if (data.cursor) ordersCursor = data.cursor;
+            nextToken = data.next_token;
+        } while (nextToken);
+        
+        renderOrders();
+    } catch (error) {
+        console.error('Error loading orders:', error);
+    }
+}
+
+function mergeOrders(changed) {
+    changed.forEach(order => {
+        const index = allOrders.findIndex(o => o.pedido_id === order.pedido_id);
+        if (index === -1) {
+            allOrders.push(order);
+        } else {
+            allOrders[index] = { ...allOrders[index], ...order };
+        }
+        // Pedidos en cocina asignados a este empleado (otro dispositivo, recarga o /lote)
+        if (currentUser && order.estado === 'en_preparacion' && order.cocinero_dni &&
+            order.cocinero_dni === currentUser.dni && !workingOrders.has(order.pedido_id)) {
+            trackWorkingOrder(order.pedido_id, order.cocinero_dni, order.estado);
+        }
+    });
 }
 
 function renderOrders() {
@@ -568,6 +623,7 @@ async function handleStatusChange() {
         
         const data = await response.json();
         showNotification(data.message || 'Estado actualizado correctamente', 'success');
+        trackWorkingOrder(orderId, payload.empleado_id, newStatusValue);
         closeModal();
         
         // Actualizar el pedido localmente
@@ -943,7 +999,10 @@ async function handleChangeStatusForm(e) {
         'delivery_entregar': `${API_CONFIG.empleadoUrl}/empleados/delivery/entregar`
     };
     
-    const endpoint = endpoints[action];
+    // Varios IDs separados por coma: mismo cambio con el endpoint /lote
+    const orderIds = [...new Set(orderId.split(',').map(id => id.trim()).filter(Boolean))];
+    const enLote = orderIds.length > 1;
+    const endpoint = enLote ? `${endpoints[action]}/lote` : endpoints[action];
     
     try {
         const response = await fetch(endpoint, {
@@ -951,10 +1010,9 @@ async function handleChangeStatusForm(e) {
             headers: {
                 'Content-Type': 'application/json'
             },
-            body: JSON.stringify({
-                order_id: orderId,
-                empleado_id: empleadoId
-            })
+            body: JSON.stringify(enLote
+                ? { order_ids: orderIds, empleado_id: empleadoId }
+                : { order_id: orderId, empleado_id: empleadoId })
         });
         
         if (!response.ok) {
@@ -963,7 +1021,19 @@ async function handleChangeStatusForm(e) {
         }
         
         const data = await response.json();
-        showNotification('Estado cambiado exitosamente', 'success');
+        // En lote solo se registran los pedidos aceptados (207 = algunos rechazados)
+        const aceptados = enLote ? (data.publicados || []) : [orderId];
+        showNotification(
+            enLote ? `${aceptados.length}/${orderIds.length} pedidos cambiados` : 'Estado cambiado exitosamente',
+            response.status === 207 ? 'info' : 'success'
+        );
+        const estado = {
+            cocina_iniciar: 'en_preparacion',
+            cocina_completar: 'cocina_completa',
+            delivery_iniciar: 'pedido_en_camino',
+            delivery_entregar: 'entregado'
+        }[action];
+        aceptados.forEach(id => trackWorkingOrder(id, empleadoId, estado));
         
         document.getElementById('orderIdInput').value = '';
         document.getElementById('statusActionSelect').value = '';
@@ -1015,7 +1085,7 @@ async function handleConsultStatusForm(e) {
         resultElement.innerHTML = `
             <div style="background: #f8f9fa; padding: 15px; border-radius: 8px; border-left: 4px solid #3498db;">
                 <h4 style="margin: 0 0 10px 0;">Pedido #${data.pedido_id || orderId}</h4>
-                <p><strong>Estado:</strong> <span class="status-${data.estado || data.status}">${estadoLabel}</span></p>
+                <p><strong>Estado:</strong> <span id="orderStatusLive" class="status-${data.estado || data.status}">${estadoLabel}</span></p>
                 <p><strong>Cliente:</strong> ${data.usuario_email || data.cliente || 'N/A'}</p>
                 <p><strong>Total:</strong> $${parseFloat(data.total || 0).toFixed(2)}</p>
                 ${productos.length > 0 ? '<p><strong>Productos:</strong></p>' + productosHTML : ''}
@@ -1025,12 +1095,133 @@ async function handleConsultStatusForm(e) {
             </div>
         `;
         
+        followOrderStatus(data.pedido_id || orderId);
+        
     } catch (error) {
         console.error('Error consulting status:', error);
         resultElement.innerHTML = `<p style="color: #e74c3c;">Error: ${error.message}</p>`;
     }
 }
 
+// ==================== Seguimiento de estado en tiempo real ====================
+// Con WebSocket el backend empuja cada transición; el polling queda solo como respaldo
+let statusSocket = null;
+let statusPollTimer = null;
+let followedOrderId = null;
+
+function updateLiveStatus(estado) {
+    const span = document.getElementById('orderStatusLive');
+    if (!span || !estado) return;
+    span.className = `status-${estado}`;
+    span.textContent = getEstadoLabel(estado);
+}
+
+function subscribeOrder(orderId) {
+    statusSocket.send(JSON.stringify({
+        action: 'suscribir',
+        local_id: API_CONFIG.localId,
+        pedido_id: orderId
+    }));
+}
+
+function startStatusPolling() {
+    if (statusPollTimer) return;
+    statusPollTimer = setInterval(async () => {
+        if (!followedOrderId) return;
+        try {
+            const response = await fetch(
+                `${API_CONFIG.clientesUrl}/pedido/status?local_id=${API_CONFIG.localId}&pedido_id=${followedOrderId}`
+            );
+            if (response.ok) {
+                const data = await response.json();
+                updateLiveStatus(data.estado);
+            }
+        } catch (error) {
+            console.error('Error polling status:', error);
+        }
+    }, CONFIG.autoRefreshInterval);
+}
+
+function stopStatusPolling() {
+    clearInterval(statusPollTimer);
+    statusPollTimer = null;
+}
+
+function followOrderStatus(orderId) {
+    followedOrderId = orderId;
+    
+    if (!API_CONFIG.clientesWsUrl || !authToken || !('WebSocket' in window)) {
+        startStatusPolling();
+        return;
+    }
+    
+    if (statusSocket && statusSocket.readyState === WebSocket.OPEN) {
+        subscribeOrder(orderId);
+        return;
+    }
+    if (statusSocket && statusSocket.readyState === WebSocket.CONNECTING) {
+        return;  // onopen se suscribe a followedOrderId
+    }
+    
+    statusSocket = new WebSocket(`${API_CONFIG.clientesWsUrl}?token=${encodeURIComponent(authToken)}`);
+    statusSocket.onopen = () => {
+        stopStatusPolling();
+        if (followedOrderId) subscribeOrder(followedOrderId);
+    };
+    statusSocket.onmessage = (event) => {
+        const msg = JSON.parse(event.data);
+        if (msg.tipo === 'estado' && msg.pedido_id === followedOrderId) {
+            updateLiveStatus(msg.estado);
+        }
+    };
+    statusSocket.onclose = () => {
+        statusSocket = null;
+        if (followedOrderId) startStatusPolling();
+    };
+}
+
+// ==================== Heartbeat de pedidos en curso ====================
+// PedidoEnCocina y Delivery tienen HeartbeatSeconds en la Step Function: si la app deja de
+// avisar (tablet apagada, sin red) el pedido se reintenta y lo toma otro empleado.
+function trackWorkingOrder(orderId, empleadoId, estado) {
+    if (estado === 'en_preparacion' || estado === 'pedido_en_camino') {
+        workingOrders.set(orderId, empleadoId);
+        sendHeartbeat(orderId, empleadoId);
+    } else if (estado === 'cocina_completa' || estado === 'entregado') {
+        workingOrders.delete(orderId);
+    }
+    saveWorkingOrders();
+}
+
+function saveWorkingOrders() {
+    localStorage.setItem('workingOrders', JSON.stringify([...workingOrders]));
+}
+
+async function sendHeartbeat(orderId, empleadoId) {
+    try {
+        const response = await fetch(`${API_CONFIG.empleadoUrl}${API_CONFIG.endpoints.pedidosHeartbeat}`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify({ order_id: orderId, empleado_id: empleadoId })
+        });
+        // 404 / 410: el pedido ya no está en una etapa activa (terminó, expiró o se reasignó)
+        if (response.status === 404 || response.status === 410) {
+            workingOrders.delete(orderId);
+            saveWorkingOrders();
+        }
+        // 409: la etapa todavía no guardó su token; se reintenta en el siguiente ciclo
+    } catch (error) {
+        console.error('Error sending heartbeat:', error);
+    }
+}
+
+setInterval(() => {
+    if (!authToken) return;
+    workingOrders.forEach((empleadoId, orderId) => sendHeartbeat(orderId, empleadoId));
+}, CONFIG.heartbeatInterval);
+
 // ==================== Auto-refresh ====================
 // Refresh orders every 30 seconds
 setInterval(() => {
@@ -9,6 +9,9 @@ const API_CONFIG = {
     productsUrl: 'https://y6am9ly97g.execute-api.us-east-1.amazonaws.com',
     analyticUrl: 'https://9chtp1assj.execute-api.us-east-1.amazonaws.com',
     
+    // WebSocket de estados de pedido (service-clientes). Vacío = polling de /pedido/status
+    clientesWsUrl: '',
+    
     // ID del local por defecto
     localId: 'LOCAL-001',
     
@@ -25,6 +28,8 @@ const API_CONFIG = {
         empaqueCompletar: '/empleados/empaque/completar',
         deliveryIniciar: '/empleados/delivery/iniciar',
         deliveryEntregar: '/empleados/delivery/entregar',
+        pedidosCambios: '/empleados/pedidos/cambios',
+        pedidosHeartbeat: '/empleados/pedidos/heartbeat',
         
         // Pedidos - Cliente
         pedidoCreate: '/pedido/create',
@@ -70,6 +75,10 @@ const CONFIG = {
     
     // Tiempo de espera para las peticiones HTTP en milisegundos
     requestTimeout: 10000,
+    
+    // Heartbeat de los pedidos que el empleado está cocinando o repartiendo.
+    // Debe ser bastante menor que HeartbeatSeconds de la Step Function (60 s en cocina y delivery)
+    heartbeatInterval: 20000,
 };
 
 // ==================== Instrucciones de Configuración ====================
@@ -0,0 +1,202 @@
+import os
+import json
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+import boto3
+from boto3.dynamodb.types import TypeSerializer, TypeDeserializer
+
+# ---------- Config ----------
+PRODUCT_CACHE_SIZE = int(os.environ.get("PRODUCT_CACHE_SIZE", "1024"))
+# TTL del nivel en memoria: acota cuánto puede vivir un precio viejo en un
+# contenedor que no recibió la invalidación (el stream solo limpia el nivel compartido)
+PRODUCT_CACHE_TTL = int(os.environ.get("PRODUCT_CACHE_TTL", "30"))
+# Mismo orden que el LRU: una lectura que trae el precio viejo de DynamoDB y escribe el
+# nivel compartido después de la invalidación del stream lo deja ahí hasta que venza
+PRODUCT_CACHE_SHARED_TTL = int(os.environ.get("PRODUCT_CACHE_SHARED_TTL", "30"))
+PRODUCT_CACHE_REDIS_URL = os.environ.get("PRODUCT_CACHE_REDIS_URL", "")
+
+_serializer = TypeSerializer()
+_deserializer = TypeDeserializer()
+
+
+def cache_key(local_id, producto_id):
+    return f"producto:{local_id}:{producto_id}"
+
+
+# ---------- Nivel 1: LRU en el contenedor ----------
+class LRUCache:
+    """LRU acotado con expiración por entrada. Vive mientras el contenedor esté caliente."""
+
+    def __init__(self, max_size=PRODUCT_CACHE_SIZE, ttl=PRODUCT_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        value, expires_at = entry
+        if expires_at < time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key, value):
+        self._data[key] = (value, time.monotonic() + self.ttl)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+
+    def delete(self, key):
+        self._data.pop(key, None)
+
+    def clear(self):
+        self._data.clear()
+
+
+# ---------- Nivel 2: caché compartida (opcional) ----------
+class SharedTier(ABC):
+    """Interfaz mínima del nivel compartido entre contenedores (un nivel incompleto falla al instanciarse)."""
+
+    @abstractmethod
+    def get(self, key):
+        ...
+
+    @abstractmethod
+    def set(self, key, value, ttl):
+        ...
+
+    @abstractmethod
+    def delete(self, key):
+        ...
+
+
+class InMemorySharedTier(SharedTier):
+    """Sustituto local del nivel compartido (pruebas y ejecución local)."""
+
+    def __init__(self):
+        self._data = {}
+
+    def get(self, key):
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at < time.time():
+            del self._data[key]
+            return None
+        return value
+
+    def set(self, key, value, ttl):
+        self._data[key] = (value, time.time() + ttl)
+
+    def delete(self, key):
+        self._data.pop(key, None)
+
+
+class RedisSharedTier(SharedTier):
+    """Nivel compartido sobre Redis/ElastiCache. Guarda el item en formato DynamoDB JSON."""
+
+    def __init__(self, url):
+        import redis  # dependencia opcional: solo si se configura PRODUCT_CACHE_REDIS_URL
+        self._client = redis.Redis.from_url(url, socket_timeout=0.2)
+
+    def get(self, key):
+        raw = self._client.get(key)
+        if raw is None:
+            return None
+        return {k: _deserializer.deserialize(v) for k, v in json.loads(raw).items()}
+
+    def set(self, key, value, ttl):
+        raw = json.dumps({k: _serializer.serialize(v) for k, v in value.items()})
+        self._client.set(key, raw, ex=ttl)
+
+    def delete(self, key):
+        self._client.delete(key)
+
+
+def build_shared_tier():
+    if not PRODUCT_CACHE_REDIS_URL:
+        return None
+    try:
+        return RedisSharedTier(PRODUCT_CACHE_REDIS_URL)
+    except Exception as e:
+        print(f"Caché compartida deshabilitada: {e}")
+        return None
+
+
+# ---------- Read-through ----------
+class ProductCache:
+    """
+    Lectura de productos por (local_id, producto_id):
+      LRU del contenedor -> nivel compartido (si existe) -> DynamoDB.
+    Las invalidaciones llegan desde el stream de la tabla de productos.
+    """
+
+    def __init__(self, table, lru=None, shared=None, shared_ttl=PRODUCT_CACHE_SHARED_TTL):
+        self.table = table
+        self.lru = lru or LRUCache()
+        self.shared = shared
+        self.shared_ttl = shared_ttl
+
+    def _shared_get(self, key):
+        if not self.shared:
+            return None
+        try:
+            return self.shared.get(key)
+        except Exception as e:
+            # La caché compartida nunca debe tumbar la lectura
+            print(f"Error leyendo caché compartida: {e}")
+            return None
+
+    def _shared_set(self, key, item):
+        if not self.shared:
+            return
+        try:
+            self.shared.set(key, item, self.shared_ttl)
+        except Exception as e:
+            print(f"Error escribiendo caché compartida: {e}")
+
+    def get(self, local_id, producto_id):
+        key = cache_key(local_id, producto_id)
+        item = self.lru.get(key)
+        if item is not None:
+            return item
+
+        item = self._shared_get(key)
+        if item is None:
+            r = self.table.get_item(Key={"local_id": local_id, "producto_id": producto_id})
+            item = r.get("Item")
+            if item is None:
+                return None
+            self._shared_set(key, item)
+
+        self.lru.set(key, item)
+        return item
+
+    def invalidate(self, local_id, producto_id):
+        key = cache_key(local_id, producto_id)
+        self.lru.delete(key)
+        if self.shared:
+            self.shared.delete(key)
+
+
+_cache = None
+
+
+def get_product_cache(table_name):
+    """Instancia por contenedor (se reutiliza entre invocaciones calientes)."""
+    global _cache
+    if _cache is None:
+        table = boto3.resource("dynamodb").Table(table_name)
+        _cache = ProductCache(table, shared=build_shared_tier())
+    return _cache
@@ -0,0 +1,32 @@
+import os
+import json
+from boto3.dynamodb.types import TypeDeserializer
+from product_cache import get_product_cache
+
+PRODUCTS_TABLE = os.environ.get("PRODUCTS_TABLE", "PRODUCTS_TABLE")
+
+_deserializer = TypeDeserializer()
+
+
+def lambda_handler(event, context):
+    """
+    Consumidor del stream de la tabla de productos.
+    Cada INSERT/MODIFY/REMOVE invalida la entrada (local_id, producto_id) en la caché.
+    Reporta fallos por registro (ReportBatchItemFailures) para reintentar solo esos.
+    """
+    cache = get_product_cache(PRODUCTS_TABLE)
+    failures = []
+
+    for record in event.get("Records", []):
+        try:
+            keys = record["dynamodb"]["Keys"]
+            local_id = _deserializer.deserialize(keys["local_id"])
+            producto_id = _deserializer.deserialize(keys["producto_id"])
+            cache.invalidate(local_id, producto_id)
+        except Exception as e:
+            print(f"Error invalidando caché ({record.get('eventID')}): {e}")
+            failures.append({"itemIdentifier": record["dynamodb"].get("SequenceNumber")})
+
+    if failures:
+        print(json.dumps({"invalidaciones_fallidas": len(failures)}))
+    return {"batchItemFailures": failures}
@@ -2,6 +2,7 @@ import os
 import json
 import base64
 import uuid
+import unicodedata
 from decimal import Decimal, InvalidOperation
 from datetime import datetime
 
@@ -65,6 +66,13 @@ def _to_int(n):
 def _slug(s: str) -> str:
     return "".join(ch.lower() if ch.isalnum() else "-" for ch in s).strip("-")
 
+def _normalizar_nombre(s: str) -> str:
+    """Clave de orden del LSI by_nombre: minúsculas, sin tildes ni espacios repetidos."""
+    sin_tildes = "".join(
+        ch for ch in unicodedata.normalize("NFKD", s) if not unicodedata.combining(ch)
+    )
+    return " ".join(sin_tildes.lower().split())
+
 def _strip_data_uri(b64s: str):
     """Devuelve (base64_puro, mime_hint) si viene como data URI."""
     if "," in b64s and "base64" in b64s[:64].lower():
@@ -195,6 +203,7 @@ def lambda_handler(event, context):
         "local_id": local_id.strip(),
         "producto_id": producto_id,      # Nuevo: Sort Key
         "nombre": nombre.strip(),
+        "nombre_normalizado": _normalizar_nombre(nombre),  # SK del LSI by_nombre
         "precio": precio,                # Decimal -> DDB Number
         "descripcion": descripcion or "",
         "categoria": categoria,
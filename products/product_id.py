@@ -1,14 +1,14 @@
 import os
 import json
-import boto3
 from botocore.exceptions import ClientError
+from product_cache import get_product_cache
 
 # ---------- Config ----------
 CORS_HEADERS = {"Access-Control-Allow-Origin": "*"}
 PRODUCTS_TABLE = os.environ.get("PRODUCTS_TABLE", "PRODUCTS_TABLE")
 
-dynamodb = boto3.resource("dynamodb")
-productos_table = dynamodb.Table(PRODUCTS_TABLE)
+# Read-through: LRU del contenedor + nivel compartido opcional, invalidado por stream
+product_cache = get_product_cache(PRODUCTS_TABLE)
 
 # ---------- Helpers ----------
 def _resp(code, payload=None):
@@ -47,13 +47,11 @@ def lambda_handler(event, context):
     
     # Buscar producto
     try:
-        response = productos_table.get_item(
-            Key={"local_id": local_id, "producto_id": producto_id}
-        )
+        item = product_cache.get(local_id, producto_id)
     except ClientError as e:
         return _resp(500, {"error": f"Error al buscar producto: {str(e)}"})
     
-    if "Item" not in response:
+    if item is None:
         return _resp(404, {"error": "Producto no encontrado"})
     
-    return _resp(200, {"producto": response["Item"]})
+    return _resp(200, {"producto": item})
@@ -43,18 +43,42 @@ def _convert_decimal(obj):
         return [_convert_decimal(i) for i in obj]
     return obj
 
-def _encode_token(lek: dict | None) -> str | None:
+# Ordenamientos soportados -> (IndexName, ScanIndexForward)
+# by_precio / by_nombre son LSIs sobre la tabla de productos (PK local_id)
+SORT_OPTIONS = {
+    "precio": ("by_precio", True),
+    "-precio": ("by_precio", False),
+    "nombre": ("by_nombre", True),
+    "-nombre": ("by_nombre", False),
+}
+
+def _lek_to_json(obj):
+    # Las claves de los LSIs incluyen precio (Number) -> Decimal no es serializable
+    if isinstance(obj, Decimal):
+        return int(obj) if obj % 1 == 0 else float(obj)
+    raise TypeError(f"Tipo no serializable: {type(obj)}")
+
+def _encode_token(lek: dict | None, sort: str | None = None) -> str | None:
     if not lek:
         return None
-    return base64.urlsafe_b64encode(json.dumps(lek).encode("utf-8")).decode("ascii")
+    payload = {"sort": sort, "lek": lek} if sort else lek
+    raw = json.dumps(payload, default=_lek_to_json)
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
 
-def _decode_token(tok: str | None) -> dict | None:
+def _decode_token(tok: str | None) -> tuple[dict | None, str | None]:
+    """Devuelve (lek, sort). Los tokens sin ordenamiento son el LEK plano (legado)."""
     if not tok:
-        return None
+        return None, None
     try:
-        return json.loads(base64.urlsafe_b64decode(tok.encode("ascii")).decode("utf-8"))
+        data = json.loads(
+            base64.urlsafe_b64decode(tok.encode("ascii")).decode("utf-8"),
+            parse_float=Decimal,
+        )
     except Exception:
-        return None
+        return None, None
+    if isinstance(data, dict) and "lek" in data and "sort" in data:
+        return data["lek"], data["sort"]
+    return data, None
 
 def lambda_handler(event, context):
     # CORS preflight
@@ -83,9 +107,18 @@ def lambda_handler(event, context):
     if size <= 0 or size > 100:
         size = 10
 
+    # Ordenamiento opcional (respaldado por LSIs)
+    sort = body.get("sort")
+    if sort is not None and sort not in SORT_OPTIONS:
+        return _resp(400, {"error": f"sort inválido. Valores permitidos: {', '.join(SORT_OPTIONS)}"})
+    if sort and not local_id:
+        return _resp(400, {"error": "sort requiere local_id"})
+
     # Paginación por token (recomendada)
     next_token_in = body.get("next_token")
-    lek = _decode_token(next_token_in)
+    lek, token_sort = _decode_token(next_token_in)
+    if lek and token_sort != sort:
+        return _resp(400, {"error": "next_token no corresponde al ordenamiento solicitado"})
 
     # Compatibilidad page/size solo si no viene next_token
     page = None
@@ -115,6 +148,9 @@ def lambda_handler(event, context):
         }
         if categoria:
             count_args["FilterExpression"] = Attr("categoria").eq(categoria)
+        if sort:
+            # Los LSIs son dispersos: contar sobre el mismo índice que se pagina
+            count_args["IndexName"] = SORT_OPTIONS[sort][0]
         count_lek = None
         while True:
             if count_lek:
@@ -140,6 +176,10 @@ def lambda_handler(event, context):
         "KeyConditionExpression": key_cond,
         "Limit": size
     }
+    if sort:
+        index_name, forward = SORT_OPTIONS[sort]
+        qargs["IndexName"] = index_name
+        qargs["ScanIndexForward"] = forward
     if categoria:
         qargs["FilterExpression"] = Attr("categoria").eq(categoria)
 
@@ -168,11 +208,13 @@ def lambda_handler(event, context):
 
     items = rpage.get("Items", [])
     lek_out = rpage.get("LastEvaluatedKey")
-    next_token_out = _encode_token(lek_out)
+    next_token_out = _encode_token(lek_out, sort)
 
     items = _convert_decimal(items)
 
     resp = {"contents": items, "size": size, "next_token": next_token_out}
+    if sort:
+        resp["sort"] = sort
     if page is not None:
         resp["page"] = page
     if include_total:
@@ -1,4 +1,5 @@
 import os, json, boto3
+import unicodedata
 from decimal import Decimal, InvalidOperation
 from datetime import datetime
 from botocore.exceptions import ClientError
@@ -47,6 +48,13 @@ def _to_decimal(obj):
         return Decimal(str(obj))
     return obj
 
+def _normalizar_nombre(s: str) -> str:
+    """Clave de orden del LSI by_nombre: minúsculas, sin tildes ni espacios repetidos."""
+    sin_tildes = "".join(
+        ch for ch in unicodedata.normalize("NFKD", s) if not unicodedata.combining(ch)
+    )
+    return " ".join(sin_tildes.lower().split())
+
 def lambda_handler(event, context):
     # CORS preflight
     method = event.get("httpMethod") or event.get("requestContext", {}).get("http", {}).get("method")
@@ -84,8 +92,18 @@ def lambda_handler(event, context):
         if forbidden in data:
             data.pop(forbidden, None)
 
+    # nombre_normalizado es la SK del LSI by_nombre: se deriva, no se acepta del cliente
+    data.pop("nombre_normalizado", None)
+
     if not data:
         return _resp(400, {"error": "Body vacío; nada que actualizar"})
+    if "nombre" in data:
+        if not isinstance(data["nombre"], str) or not data["nombre"].strip():
+            return _resp(400, {"error": "nombre debe ser string no vacío"})
+        data["nombre_normalizado"] = _normalizar_nombre(data["nombre"])
+    # precio es la SK del LSI by_precio: debe seguir siendo numérico
+    if "precio" in data and not isinstance(data["precio"], Decimal):
+        return _resp(400, {"error": "precio debe ser numérico"})
 
     # Construir UpdateExpression seguro
     expr_names, expr_values, sets = {}, {}, []
@@ -0,0 +1,207 @@
+import os
+from datetime import datetime, timedelta, timezone
+import boto3
+from boto3.dynamodb.conditions import Key
+from botocore.exceptions import ClientError
+from pedidos_keys import local_estado, pedido_pk
+
+ROL_COCINERO = 'Cocinero'
+# Orders waiting for a cook / being cooked (states written by the stepFunction handlers)
+ESTADO_PENDIENTE = 'procesando'
+ESTADO_EN_COCINA = 'en_preparacion'
+
+# Max orders a cook holds at once (assigned + cooking)
+KITCHEN_CAP_POR_COCINERO = int(os.environ.get('KITCHEN_CAP_POR_COCINERO', '3'))
+# Promised kitchen time per order and estimated prep time per unit ordered
+KITCHEN_PROMESA_MINUTOS = int(os.environ.get('KITCHEN_PROMESA_MINUTOS', '30'))
+KITCHEN_PREP_MINUTOS_ITEM = int(os.environ.get('KITCHEN_PREP_MINUTOS_ITEM', '4'))
+# Candidates tried when another cook claims the same order first
+MAX_CANDIDATOS = 5
+
+
+def _parse_iso(value):
+    dt = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+def inicio_limite(pedido):
+    """
+    Latest time cooking can start and still meet the promise:
+    created_at + promise - estimated prep time. Earliest first = EDF.
+    """
+    unidades = sum(int(p.get('cantidad', 1)) for p in pedido.get('productos', []) if isinstance(p, dict)) or 1
+    creado = _parse_iso(pedido['created_at'])
+    return creado + timedelta(minutes=KITCHEN_PROMESA_MINUTOS - KITCHEN_PREP_MINUTOS_ITEM * unidades)
+
+
+class DynamoCocinaStore:
+    """Cooks from the EMPLEADOS table, orders from the sparse by_local_estado GSI."""
+
+    def __init__(self, table_empleados, table_pedidos):
+        dynamodb = boto3.resource('dynamodb')
+        self._empleados = dynamodb.Table(table_empleados)
+        self._pedidos = dynamodb.Table(table_pedidos)
+        self._client = dynamodb.meta.client
+
+    def cocineros(self, local_id):
+        """[{dni, pedidos_en_curso}] for the local's cooks"""
+        kwargs = {'KeyConditionExpression': Key('local_id').eq(local_id)}
+        cocineros = []
+        while True:
+            r = self._empleados.query(**kwargs)
+            for it in r.get('Items', []):
+                if it.get('role') == ROL_COCINERO:
+                    cocineros.append({'dni': it['dni'], 'pedidos_en_curso': set(it.get('pedidos_en_curso', set()))})
+            if 'LastEvaluatedKey' not in r:
+                return cocineros
+            kwargs['ExclusiveStartKey'] = r['LastEvaluatedKey']
+
+    def pedidos(self, local_id, estado):
+        kwargs = {
+            'IndexName': 'by_local_estado',
+            'KeyConditionExpression': Key('local_estado').eq(local_estado(local_id, estado)),
+        }
+        items = []
+        while True:
+            r = self._pedidos.query(**kwargs)
+            items.extend(r.get('Items', []))
+            if 'LastEvaluatedKey' not in r:
+                return items
+            kwargs['ExclusiveStartKey'] = r['LastEvaluatedKey']
+
+    def reservar(self, local_id, dni, pedido, cap):
+        """
+        Claims the order for the cook in one transaction: the order must still be
+        unassigned and the cook under the cap. False if either condition fails.
+        """
+        try:
+            self._client.transact_write_items(TransactItems=[
+                {'Update': {
+                    'TableName': self._pedidos.name,
+                    # GSI items carry the table key (possibly sharded local_id)
+                    'Key': {'local_id': pedido['local_id'], 'pedido_id': pedido['pedido_id']},
+                    'UpdateExpression': 'SET cocinero_dni = :dni, asignado_at = :ahora',
+                    'ConditionExpression': 'attribute_not_exists(cocinero_dni) AND estado = :pendiente',
+                    'ExpressionAttributeValues': {
+                        ':dni': dni,
+                        ':ahora': datetime.now(timezone.utc).isoformat(),
+                        ':pendiente': ESTADO_PENDIENTE,
+                    },
+                }},
+                {'Update': {
+                    'TableName': self._empleados.name,
+                    'Key': {'local_id': local_id, 'dni': dni},
+                    'UpdateExpression': 'ADD pedidos_en_curso :p',
+                    'ConditionExpression': '#r = :rol AND (attribute_not_exists(pedidos_en_curso) OR size(pedidos_en_curso) < :cap)',
+                    'ExpressionAttributeNames': {'#r': 'role'},
+                    'ExpressionAttributeValues': {':p': {pedido['pedido_id']}, ':rol': ROL_COCINERO, ':cap': cap},
+                }},
+            ])
+            return True
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'TransactionCanceledException':
+                return False
+            raise
+
+    def liberar(self, local_id, dni, pedido_ids):
+        if not pedido_ids:
+            return
+        try:
+            self._empleados.update_item(
+                Key={'local_id': local_id, 'dni': dni},
+                UpdateExpression='DELETE pedidos_en_curso :p',
+                ConditionExpression='attribute_exists(dni)',
+                ExpressionAttributeValues={':p': set(pedido_ids)},
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                raise
+
+
+def cocinero_asignado(tabla_estado_actual, tabla_pedidos, order_id):
+    """
+    DNI the scheduler reserved the order for (None if unassigned or unknown).
+    Only order_id comes in the trigger body: the pointer gives the Pedidos PK.
+    """
+    actual = tabla_estado_actual.get_item(Key={'pedido_id': order_id}, ConsistentRead=True).get('Item') or {}
+    if not actual.get('pedido_pk') and not actual.get('local_id'):
+        return None
+    pk = actual.get('pedido_pk') or pedido_pk(actual['local_id'], order_id)
+    pedido = tabla_pedidos.get_item(
+        Key={'local_id': pk, 'pedido_id': order_id},
+        ProjectionExpression='cocinero_dni'
+    ).get('Item') or {}
+    return pedido.get('cocinero_dni')
+
+
+class InMemoryCocinaStore:
+    """Local stand-in with the same interface (tests / local runs)."""
+
+    def __init__(self, cocineros=None, pedidos=None):
+        # cocineros: {local_id: {dni: set(pedido_ids)}}; pedidos: [dict with local_id, pedido_id, estado, created_at]
+        self._cocineros = {l: {d: set(p) for d, p in cs.items()} for l, cs in (cocineros or {}).items()}
+        self._pedidos = {p['pedido_id']: dict(p) for p in (pedidos or [])}
+
+    def cocineros(self, local_id):
+        return [{'dni': d, 'pedidos_en_curso': set(p)} for d, p in self._cocineros.get(local_id, {}).items()]
+
+    def pedidos(self, local_id, estado):
+        items = [p for p in self._pedidos.values() if p['local_id'] == local_id and p.get('estado') == estado]
+        return sorted(items, key=lambda p: p['created_at'])
+
+    def set_estado(self, pedido_id, estado):
+        self._pedidos[pedido_id]['estado'] = estado
+
+    def reservar(self, local_id, dni, pedido, cap):
+        actual = self._pedidos.get(pedido['pedido_id'])
+        en_curso = self._cocineros.get(local_id, {}).get(dni)
+        if actual is None or en_curso is None:
+            return False
+        if actual.get('cocinero_dni') or actual.get('estado') != ESTADO_PENDIENTE or len(en_curso) >= cap:
+            return False
+        actual['cocinero_dni'] = dni
+        en_curso.add(pedido['pedido_id'])
+        return True
+
+    def liberar(self, local_id, dni, pedido_ids):
+        self._cocineros.get(local_id, {}).get(dni, set()).difference_update(pedido_ids)
+
+
+def siguiente_pedido(store, local_id, dni, cap=KITCHEN_CAP_POR_COCINERO):
+    """
+    Next order for a cook: earliest start deadline among unassigned pending orders,
+    only while the cook is under the cap. Returns (status, body).
+    """
+    cocineros = {c['dni']: c['pedidos_en_curso'] for c in store.cocineros(local_id)}
+    if dni not in cocineros:
+        return 404, {'error': f'{dni} is not a {ROL_COCINERO} of {local_id}'}
+
+    pendientes = store.pedidos(local_id, ESTADO_PENDIENTE)
+    activos = {p['pedido_id'] for p in pendientes} | {p['pedido_id'] for p in store.pedidos(local_id, ESTADO_EN_COCINA)}
+
+    # The slot frees itself once the order leaves the kitchen states (cocina_completa,
+    # fallido, ...): drop those ids from the cook's set before checking the cap
+    obsoletos = cocineros[dni] - activos
+    if obsoletos:
+        store.liberar(local_id, dni, obsoletos)
+    en_curso = cocineros[dni] & activos
+    if len(en_curso) >= cap:
+        return 409, {'error': 'Cook is at capacity', 'en_curso': sorted(en_curso), 'cap': cap}
+
+    asignados = set().union(*cocineros.values())
+    candidatos = sorted(
+        (p for p in pendientes if p['pedido_id'] not in asignados and not p.get('cocinero_dni')),
+        key=inicio_limite
+    )
+    for pedido in candidatos[:MAX_CANDIDATOS]:
+        if store.reservar(local_id, dni, pedido, cap):
+            return 200, {
+                'pedido_id': pedido['pedido_id'],
+                'local_id': local_id,
+                'created_at': pedido.get('created_at'),
+                'inicio_limite': inicio_limite(pedido).isoformat(),
+                'productos': pedido.get('productos', []),
+                'en_curso': len(en_curso) + 1,
+                'cap': cap
+            }
+    return 200, {'pedido_id': None, 'message': 'No pending orders', 'en_curso': len(en_curso), 'cap': cap}
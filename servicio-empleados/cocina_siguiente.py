@@ -0,0 +1,46 @@
+import os
+import json
+from decimal import Decimal
+from event_helper import response
+from cocina_scheduler import DynamoCocinaStore, siguiente_pedido
+
+TABLE_EMPLEADOS = os.environ['TABLE_EMPLEADOS']
+TABLE_PEDIDOS = os.environ['TABLE_PEDIDOS']
+
+store = DynamoCocinaStore(TABLE_EMPLEADOS, TABLE_PEDIDOS)
+
+
+def _convert_decimal(obj):
+    if isinstance(obj, Decimal):
+        return int(obj) if obj % 1 == 0 else float(obj)
+    if isinstance(obj, dict):
+        return {k: _convert_decimal(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_convert_decimal(i) for i in obj]
+    return obj
+
+
+def handler(event, context):
+    """
+    Next order for a cook (earliest deadline first, capped per cook)
+    POST /empleados/cocina/siguiente
+    Body: { "local_id": "LOCAL-001", "empleado_id": "<dni>" }
+    The order is reserved for the cook; start it with POST /empleados/cocina/iniciar.
+    """
+    try:
+        body = json.loads(event.get('body') or '{}')
+        local_id = body.get('local_id')
+        empleado_id = body.get('empleado_id')
+
+        if not local_id or not empleado_id:
+            return response(400, {
+                'error': 'local_id and empleado_id are required'
+            })
+
+        status, payload = siguiente_pedido(store, local_id, str(empleado_id))
+        return response(status, _convert_decimal(payload))
+
+    except Exception as e:
+        return response(500, {
+            'error': str(e)
+        })
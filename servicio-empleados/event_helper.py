@@ -22,6 +22,48 @@ def publish_event(source, detail_type, detail):
         print(f"Error publishing event: {e}")
         return False
 
+# put_events accepts at most 10 entries per call
+MAX_ENTRIES_PUT_EVENTS = 10
+INTENTOS_PUT_EVENTS = 3
+
+def publish_events(source, detail_type, details):
+    """
+    Publishes many events with put_events in chunks of 10.
+    Entries rejected individually (FailedEntryCount > 0) are retried, then reported.
+    Returns (publicados, fallidos): order_ids published and [{order_id, error}].
+    """
+    publicados, fallidos = [], []
+    for i in range(0, len(details), MAX_ENTRIES_PUT_EVENTS):
+        pendientes = details[i:i + MAX_ENTRIES_PUT_EVENTS]
+        for intento in range(INTENTOS_PUT_EVENTS):
+            try:
+                r = events.put_events(
+                    Entries=[{
+                        'Source': source,
+                        'DetailType': detail_type,
+                        'Detail': json.dumps(d),
+                        'EventBusName': EVENT_BUS_NAME
+                    } for d in pendientes]
+                )
+            except Exception as e:
+                print(f"Error publishing events: {e}")
+                errores = [(d, str(e)) for d in pendientes]
+            else:
+                # Result entries are positional: same order as the request
+                errores = []
+                for d, entry in zip(pendientes, r.get('Entries', [])):
+                    if entry.get('ErrorCode'):
+                        errores.append((d, f"{entry['ErrorCode']}: {entry.get('ErrorMessage', '')}"))
+                    else:
+                        publicados.append(d['order_id'])
+            if not errores:
+                break
+            if intento == INTENTOS_PUT_EVENTS - 1:
+                fallidos.extend({'order_id': d['order_id'], 'error': err} for d, err in errores)
+            else:
+                pendientes = [d for d, _ in errores]
+    return publicados, fallidos
+
 def response(status_code, body):
     """Helper function to create HTTP response"""
     return {
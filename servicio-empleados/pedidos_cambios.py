@@ -0,0 +1,121 @@
+import os
+import json
+import base64
+from decimal import Decimal
+from datetime import datetime, timedelta, timezone
+import boto3
+from boto3.dynamodb.conditions import Key
+from event_helper import response
+
+TABLE_PEDIDOS = os.environ['TABLE_PEDIDOS']
+INDEX_NAME = 'by_local_updated'  # GSI (local_base, updated_at)
+
+# Each Lambda stamps updated_at with its own clock: re-read a small window before the
+# cursor so a slightly skewed write is not skipped. Clients upsert by pedido_id.
+DELTA_OVERLAP_SECONDS = int(os.environ.get('DELTA_OVERLAP_SECONDS', '5'))
+# Without a cursor (first load) only orders touched in this window are returned
+DELTA_DEFAULT_HOURS = int(os.environ.get('DELTA_DEFAULT_HOURS', '24'))
+MAX_SIZE = 200
+
+dynamodb = boto3.resource('dynamodb')
+pedidos_table = dynamodb.Table(TABLE_PEDIDOS)
+
+
+def _convert_decimal(obj):
+    if isinstance(obj, Decimal):
+        return int(obj) if obj % 1 == 0 else float(obj)
+    if isinstance(obj, dict):
+        return {k: _convert_decimal(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_convert_decimal(i) for i in obj]
+    return obj
+
+
+def _parse_iso(value):
+    dt = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+def _encode_token(data):
+    return base64.urlsafe_b64encode(json.dumps(data).encode('utf-8')).decode('ascii')
+
+
+def _decode_token(tok):
+    try:
+        return json.loads(base64.urlsafe_b64decode(tok.encode('ascii')).decode('utf-8'))
+    except Exception:
+        return None
+
+
+def handler(event, context):
+    """
+    Orders changed since a cursor (delta-sync for employee dashboards)
+    GET /empleados/pedidos/cambios?local_id=LOCAL-001[&cursor=<updated_at>][&next_token=...]
+    Returns { pedidos, cursor, next_token }: keep calling with next_token until it is null,
+    then store cursor for the next refresh.
+    """
+    try:
+        qs = event.get('queryStringParameters') or {}
+        local_id = (qs.get('local_id') or '').strip()
+        if not local_id:
+            return response(400, {'error': 'local_id is required'})
+
+        try:
+            size = int(qs.get('size', 100))
+        except ValueError:
+            size = 100
+        size = max(1, min(size, MAX_SIZE))
+
+        cursor = (qs.get('cursor') or '').strip() or None
+        next_token = qs.get('next_token')
+        lek = None
+        if next_token:
+            token = _decode_token(next_token)
+            if not token or token.get('local_id') != local_id:
+                return response(400, {'error': 'Invalid next_token'})
+            desde, lek = token['desde'], token['lek']
+        else:
+            try:
+                base = _parse_iso(cursor) if cursor else datetime.now(timezone.utc) - timedelta(hours=DELTA_DEFAULT_HOURS)
+            except ValueError:
+                return response(400, {'error': 'cursor must be an ISO-8601 timestamp'})
+            desde = (base - timedelta(seconds=DELTA_OVERLAP_SECONDS)).isoformat()
+
+        kwargs = {
+            'IndexName': INDEX_NAME,
+            'KeyConditionExpression': Key('local_base').eq(local_id) & Key('updated_at').gt(desde),
+            'ScanIndexForward': True,  # oldest change first: the last item is the new cursor
+            'Limit': size,
+        }
+        if lek:
+            kwargs['ExclusiveStartKey'] = lek
+        r = pedidos_table.query(**kwargs)
+        items = r.get('Items', [])
+        lek = r.get('LastEvaluatedKey')
+
+        pedidos = [
+            {
+                'pedido_id': it['pedido_id'],
+                'local_id': local_id,
+                'estado': it.get('estado'),
+                'created_at': it.get('created_at'),
+                'updated_at': it.get('updated_at'),
+                'productos': it.get('productos', []),
+                'direccion': it.get('direccion'),
+                'cocinero_dni': it.get('cocinero_dni'),
+            }
+            for it in items
+        ]
+
+        nuevo_cursor = items[-1]['updated_at'] if items else cursor
+        return response(200, {
+            'local_id': local_id,
+            'pedidos': _convert_decimal(pedidos),
+            'cursor': nuevo_cursor,
+            'next_token': _encode_token({'local_id': local_id, 'desde': desde, 'lek': lek}) if lek else None
+        })
+
+    except Exception as e:
+        return response(500, {
+            'error': str(e)
+        })
@@ -0,0 +1,95 @@
+import os
+import zlib
+from datetime import datetime, timezone
+
+from botocore.exceptions import ClientError
+
+# Número de particiones lógicas por local en la tabla de pedidos.
+# 1 = esquema original (PK = local_id). Con N > 1 la PK pasa a ser "local_id#shard"
+# y el shard se deriva de pedido_id, así que cualquier lector lo puede recalcular.
+# Cambiarlo con datos existentes requiere correr DataGenerator/migrar_pedidos_shards.py
+# Solo reparte las escrituras de la tabla base: los listados por local siguen yendo por
+# los GSIs by_local_estado / by_local_updated, cuya PK es el local sin shard.
+PEDIDOS_SHARDS = int(os.environ.get("PEDIDOS_SHARDS", "1"))
+
+SEPARADOR = "#"
+
+
+# Estados que salen del GSI disperso by_local_estado (tableros de pedidos activos)
+ESTADOS_TERMINALES = {"recibido", "fallido"}
+
+
+def shard_de(pedido_id, shards=PEDIDOS_SHARDS):
+    """Shard determinístico (crc32 es estable entre procesos, a diferencia de hash())"""
+    return zlib.crc32(pedido_id.encode("utf-8")) % shards
+
+
+def pedido_pk(local_id, pedido_id, shards=PEDIDOS_SHARDS):
+    if shards <= 1:
+        return local_id
+    return f"{local_id}{SEPARADOR}{shard_de(pedido_id, shards)}"
+
+
+def pedido_key(local_id, pedido_id, shards=PEDIDOS_SHARDS):
+    return {"local_id": pedido_pk(local_id, pedido_id, shards), "pedido_id": pedido_id}
+
+
+def local_base(pk):
+    """local_id real a partir de la PK guardada (con o sin shard)"""
+    return pk.split(SEPARADOR, 1)[0] if pk else pk
+
+
+def local_estado(local_id, estado):
+    """Clave del GSI by_local_estado (local_id#estado). None para estados terminales."""
+    if not estado or estado in ESTADOS_TERMINALES:
+        return None
+    return f"{local_id}{SEPARADOR}{estado}"
+
+
+def ahora_iso():
+    return datetime.now(timezone.utc).isoformat()
+
+
+def set_estado_kwargs(local_id, estado):
+    """
+    Argumentos de update_item para cambiar el estado manteniendo los GSIs:
+      - by_local_estado (local_estado, created_at): disperso, sin estados terminales
+      - by_local_updated (local_base, updated_at): delta-sync de los tableros
+    """
+    valores = {":estado": estado, ":lb": local_id, ":u": ahora_iso()}
+    sets = "SET estado = :estado, local_base = :lb, updated_at = :u"
+    clave = local_estado(local_id, estado)
+    if clave is None:
+        return {"UpdateExpression": f"{sets} REMOVE local_estado", "ExpressionAttributeValues": valores}
+    valores[":le"] = clave
+    return {"UpdateExpression": f"{sets}, local_estado = :le", "ExpressionAttributeValues": valores}
+
+
+def get_pedido(table, local_id, pedido_id, **kwargs):
+    """get_item con la PK con shard y, si no está, con la PK original (fila sin migrar)"""
+    item = table.get_item(Key=pedido_key(local_id, pedido_id), **kwargs).get("Item")
+    if item is None and PEDIDOS_SHARDS > 1:
+        item = table.get_item(Key={"local_id": local_id, "pedido_id": pedido_id}, **kwargs).get("Item")
+    return item
+
+
+def update_pedido(table, local_id, pedido_id, **kwargs):
+    """
+    update_item sobre la fila del pedido, esté o no migrada.
+    No crea filas nuevas: exige que el pedido exista bajo la clave usada.
+    """
+    condicion = "attribute_exists(pedido_id)"
+    if kwargs.get("ConditionExpression"):
+        condicion = f"({kwargs['ConditionExpression']}) AND {condicion}"
+    kwargs["ConditionExpression"] = condicion
+
+    claves = [pedido_key(local_id, pedido_id)]
+    if PEDIDOS_SHARDS > 1:
+        claves.append({"local_id": local_id, "pedido_id": pedido_id})
+    for i, key in enumerate(claves):
+        try:
+            return table.update_item(Key=key, **kwargs)
+        except ClientError as e:
+            if e.response["Error"]["Code"] != "ConditionalCheckFailedException" or i == len(claves) - 1:
+                raise
+
@@ -0,0 +1,104 @@
+import os
+from decimal import Decimal
+from concurrent.futures import ThreadPoolExecutor
+import boto3
+from boto3.dynamodb.conditions import Key
+from event_helper import response
+from pedidos_keys import local_estado
+
+TABLE_PEDIDOS = os.environ['TABLE_PEDIDOS']
+INDEX_NAME = 'by_local_estado'
+
+# Active states written by the stepFunction handlers (recibido / fallido are not indexed)
+ESTADOS_ACTIVOS = [
+    'procesando',
+    'en_preparacion',
+    'cocina_completa',
+    'empaquetando',
+    'pedido_en_camino',
+    'entrega_delivery',
+]
+MAX_SIZE = 200
+
+
+def _convert_decimal(obj):
+    if isinstance(obj, Decimal):
+        return int(obj) if obj % 1 == 0 else float(obj)
+    if isinstance(obj, dict):
+        return {k: _convert_decimal(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_convert_decimal(i) for i in obj]
+    return obj
+
+
+def _cola(local_id, estado, size):
+    """One query per state: oldest first, which is the order the board works in"""
+    # boto3 resources are not thread-safe: one per thread
+    table = boto3.session.Session().resource('dynamodb').Table(TABLE_PEDIDOS)
+    kwargs = {
+        'IndexName': INDEX_NAME,
+        'KeyConditionExpression': Key('local_estado').eq(local_estado(local_id, estado)),
+        'ScanIndexForward': True,
+        'Limit': size,
+    }
+    items = []
+    while True:
+        r = table.query(**kwargs)
+        items.extend(r.get('Items', []))
+        if len(items) >= size or 'LastEvaluatedKey' not in r:
+            break
+        kwargs['ExclusiveStartKey'] = r['LastEvaluatedKey']
+    pedidos = [
+        {
+            'pedido_id': it['pedido_id'],
+            'estado': it.get('estado'),
+            'created_at': it.get('created_at'),
+            'productos': it.get('productos', []),
+            'direccion': it.get('direccion'),
+        }
+        for it in items[:size]
+    ]
+    return estado, pedidos, len(items) > size or 'LastEvaluatedKey' in r
+
+
+def handler(event, context):
+    """
+    Active orders board per state
+    GET /empleados/pedidos/tablero?local_id=LOCAL-001[&estado=en_preparacion,cocina_completa][&size=50]
+    Reads the sparse by_local_estado GSI; never scans the pedidos table.
+    """
+    try:
+        qs = event.get('queryStringParameters') or {}
+        local_id = (qs.get('local_id') or '').strip()
+        if not local_id:
+            return response(400, {'error': 'local_id is required'})
+
+        estados = [e.strip() for e in (qs.get('estado') or '').split(',') if e.strip()] or ESTADOS_ACTIVOS
+        invalidos = [e for e in estados if e not in ESTADOS_ACTIVOS]
+        if invalidos:
+            return response(400, {
+                'error': f"Invalid estado: {', '.join(invalidos)}",
+                'estados_validos': ESTADOS_ACTIVOS
+            })
+
+        try:
+            size = int(qs.get('size', 50))
+        except ValueError:
+            size = 50
+        size = max(1, min(size, MAX_SIZE))
+
+        with ThreadPoolExecutor(max_workers=len(estados)) as pool:
+            resultados = list(pool.map(lambda e: _cola(local_id, e, size), estados))
+
+        return response(200, {
+            'local_id': local_id,
+            'tablero': {
+                estado: {'pedidos': _convert_decimal(pedidos), 'total': len(pedidos), 'truncado': truncado}
+                for estado, pedidos, truncado in resultados
+            }
+        })
+
+    except Exception as e:
+        return response(500, {
+            'error': str(e)
+        })
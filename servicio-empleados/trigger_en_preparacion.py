@@ -1,11 +1,19 @@
+import os
 import json
+import boto3
 from event_helper import publish_event, response
+from cocina_scheduler import cocinero_asignado
+
+dynamodb = boto3.resource('dynamodb')
+estado_actual_table = dynamodb.Table(os.environ['TABLE_ESTADO_ACTUAL'])
+pedidos_table = dynamodb.Table(os.environ['TABLE_PEDIDOS'])
 
 def handler(event, context):
     """
     Trigger EnPreparacion event
     POST /empleados/cocina/iniciar
     Body: { "order_id": "...", "empleado_id": "..." }
+    Unassigned orders can be started by any cook; assigned ones only by their cook.
     """
     try:
         body = json.loads(event.get('body', '{}'))
@@ -17,6 +25,14 @@ def handler(event, context):
                 'error': 'order_id and empleado_id are required'
             })
         
+        # Orders reserved by POST /empleados/cocina/siguiente can only be started by that cook
+        asignado = cocinero_asignado(estado_actual_table, pedidos_table, order_id)
+        if asignado and asignado != str(empleado_id):
+            return response(409, {
+                'error': 'Order is assigned to another cook',
+                'order_id': order_id
+            })
+        
         detail = {
             'order_id': order_id,
             'empleado_id': empleado_id,
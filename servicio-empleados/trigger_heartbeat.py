@@ -0,0 +1,71 @@
+import os
+import json
+import boto3
+from botocore.exceptions import ClientError
+from event_helper import response
+
+# Current-state pointer written by the stepFunction handlers (PK pedido_id, holds the open taskToken)
+TABLE_ESTADO_ACTUAL = os.environ['TABLE_ESTADO_ACTUAL']
+
+dynamodb = boto3.resource('dynamodb')
+stepfunctions = boto3.client('stepfunctions')
+
+# The stage already finished or timed out: the client should stop sending heartbeats
+TOKEN_CERRADO = ('TaskTimedOut', 'TaskDoesNotExist', 'InvalidToken')
+
+
+def handler(event, context):
+    """
+    Heartbeat while an employee works an order (cooking, delivering)
+    POST /empleados/pedidos/heartbeat
+    Body: { "order_id": "...", "empleado_id": "..." }
+    Stages with HeartbeatSeconds fail over to a retry when the client stops calling this.
+    """
+    try:
+        body = json.loads(event.get('body') or '{}')
+        order_id = body.get('order_id')
+        empleado_id = body.get('empleado_id')
+
+        if not order_id or not empleado_id:
+            return response(400, {
+                'error': 'order_id and empleado_id are required'
+            })
+
+        actual = dynamodb.Table(TABLE_ESTADO_ACTUAL).get_item(
+            Key={'pedido_id': order_id},
+            ConsistentRead=True
+        ).get('Item')
+        if not actual:
+            return response(404, {
+                'error': 'Order not found',
+                'order_id': order_id
+            })
+        if not actual.get('taskToken'):
+            # Between stages (or the stage has not stored its token yet): retry shortly
+            return response(409, {
+                'error': 'No active stage for this order',
+                'order_id': order_id,
+                'estado': actual.get('estado')
+            })
+
+        try:
+            stepfunctions.send_task_heartbeat(taskToken=actual['taskToken'])
+        except ClientError as e:
+            if e.response['Error']['Code'] in TOKEN_CERRADO:
+                return response(410, {
+                    'error': 'Stage is no longer active',
+                    'order_id': order_id,
+                    'estado': actual.get('estado')
+                })
+            raise
+
+        return response(200, {
+            'message': 'Heartbeat sent',
+            'order_id': order_id,
+            'estado': actual.get('estado')
+        })
+
+    except Exception as e:
+        return response(500, {
+            'error': str(e)
+        })
@@ -0,0 +1,87 @@
+import os
+import json
+import boto3
+from event_helper import publish_events, response
+from cocina_scheduler import cocinero_asignado
+
+dynamodb = boto3.resource('dynamodb')
+estado_actual_table = dynamodb.Table(os.environ['TABLE_ESTADO_ACTUAL'])
+pedidos_table = dynamodb.Table(os.environ['TABLE_PEDIDOS'])
+
+# Batch route -> (source, detail_type) of the single-order trigger it mirrors
+EVENTOS_LOTE = {
+    '/empleados/cocina/iniciar/lote': ('200millas.cocina', 'EnPreparacion'),
+    '/empleados/cocina/completar/lote': ('200millas.cocina', 'CocinaCompleta'),
+    '/empleados/empaque/completar/lote': ('200millas.cocina', 'Empaquetado'),
+    '/empleados/delivery/iniciar/lote': ('200millas.delivery', 'PedidoEnCamino'),
+    '/empleados/delivery/entregar/lote': ('200millas.delivery', 'EntregaDelivery'),
+}
+
+MAX_PEDIDOS_LOTE = 100
+
+def handler(event, context):
+    """
+    Batch variant of the employee triggers (end-of-shift bulk confirmations)
+    POST /empleados/{cocina|empaque|delivery}/.../lote
+    Body: { "order_ids": ["...", "..."], "empleado_id": "..." }
+    One event per order, so cambiar_estado resolves each order on its own.
+    """
+    try:
+        ruta = event.get('rawPath') or (event.get('requestContext', {}).get('http', {}).get('path'))
+        if ruta not in EVENTOS_LOTE:
+            return response(404, {
+                'error': f'Unknown batch route {ruta}'
+            })
+        source, detail_type = EVENTOS_LOTE[ruta]
+
+        body = json.loads(event.get('body') or '{}')
+        order_ids = body.get('order_ids')
+        empleado_id = body.get('empleado_id')
+
+        if not isinstance(order_ids, list) or not order_ids or not empleado_id:
+            return response(400, {
+                'error': 'order_ids (non-empty list) and empleado_id are required'
+            })
+        # Repeated ids in one request would only produce duplicate events
+        order_ids = list(dict.fromkeys(str(o) for o in order_ids if o))
+        if len(order_ids) > MAX_PEDIDOS_LOTE:
+            return response(400, {
+                'error': f'At most {MAX_PEDIDOS_LOTE} order_ids per request'
+            })
+
+        # Same rule as POST /empleados/cocina/iniciar: assigned orders only by their cook
+        rechazados = []
+        if detail_type == 'EnPreparacion':
+            for order_id in order_ids:
+                asignado = cocinero_asignado(estado_actual_table, pedidos_table, order_id)
+                if asignado and asignado != str(empleado_id):
+                    rechazados.append({'order_id': order_id, 'error': 'Order is assigned to another cook'})
+        excluidos = {r['order_id'] for r in rechazados}
+
+        details = [{
+            'order_id': order_id,
+            'empleado_id': empleado_id,
+            'status': 'ACEPTADO'
+        } for order_id in order_ids if order_id not in excluidos]
+
+        publicados, fallidos = publish_events(source, detail_type, details) if details else ([], [])
+        fallidos = rechazados + fallidos
+
+        if not fallidos:
+            status = 200
+        elif publicados:
+            status = 207
+        elif len(rechazados) == len(fallidos):
+            status = 409  # every order rejected by the client-side rules: a conflict, not a fault
+        else:
+            status = 500
+        return response(status, {
+            'message': f'{len(publicados)}/{len(order_ids)} {detail_type} events published',
+            'publicados': publicados,
+            'fallidos': fallidos
+        })
+
+    except Exception as e:
+        return response(500, {
+            'error': str(e)
+        })
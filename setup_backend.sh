@@ -50,6 +50,10 @@ check_env() {
   : "${TABLE_PEDIDOS:?Falta TABLE_PEDIDOS en .env}"
   : "${TABLE_HISTORIAL_ESTADOS:?Falta TABLE_HISTORIAL_ESTADOS en .env}"
   : "${TABLE_TOKENS_USUARIOS:?Falta TABLE_TOKENS_USUARIOS en .env}"
+  : "${TABLE_IDEMPOTENCIA:?Falta TABLE_IDEMPOTENCIA en .env}"
+  : "${TABLE_WS_CONEXIONES:?Falta TABLE_WS_CONEXIONES en .env}"
+  : "${TABLE_WS_SUSCRIPCIONES:?Falta TABLE_WS_SUSCRIPCIONES en .env}"
+  : "${TABLE_ESTADO_ACTUAL:?Falta TABLE_ESTADO_ACTUAL en .env}"
   : "${S3_BUCKET_NAME:?Falta S3_BUCKET_NAME en .env}"
 
   export AWS_REGION="${AWS_REGION:-us-east-1}"
@@ -145,19 +149,28 @@ create_dynamodb_tables() {
     --billing-mode PAY_PER_REQUEST \
     --region "${AWS_REGION}" 2>/dev/null || echo "   Tabla ${TABLE_LOCALES} ya existe"
   
-  # Tabla Productos
+  # Tabla Productos (LSIs by_precio / by_nombre para listados ordenados)
   aws dynamodb create-table \
     --table-name "${TABLE_PRODUCTOS}" \
-    --attribute-definitions AttributeName=local_id,AttributeType=S AttributeName=producto_id,AttributeType=S \
+    --attribute-definitions AttributeName=local_id,AttributeType=S AttributeName=producto_id,AttributeType=S AttributeName=precio,AttributeType=N AttributeName=nombre_normalizado,AttributeType=S \
     --key-schema AttributeName=local_id,KeyType=HASH AttributeName=producto_id,KeyType=RANGE \
+    --local-secondary-indexes \
+      "IndexName=by_precio,KeySchema=[{AttributeName=local_id,KeyType=HASH},{AttributeName=precio,KeyType=RANGE}],Projection={ProjectionType=ALL}" \
+      "IndexName=by_nombre,KeySchema=[{AttributeName=local_id,KeyType=HASH},{AttributeName=nombre_normalizado,KeyType=RANGE}],Projection={ProjectionType=ALL}" \
+    --stream-specification StreamEnabled=true,StreamViewType=NEW_AND_OLD_IMAGES \
     --billing-mode PAY_PER_REQUEST \
     --region "${AWS_REGION}" 2>/dev/null || echo "   Tabla ${TABLE_PRODUCTOS} ya existe"
   
-  # Tabla Pedidos
+  # Tabla Pedidos (GSI by_usuario_v2 para el historial, by_local_estado / by_local_updated para tableros)
   aws dynamodb create-table \
     --table-name "${TABLE_PEDIDOS}" \
-    --attribute-definitions AttributeName=local_id,AttributeType=S AttributeName=pedido_id,AttributeType=S \
+    --attribute-definitions AttributeName=local_id,AttributeType=S AttributeName=pedido_id,AttributeType=S AttributeName=correo,AttributeType=S AttributeName=created_at,AttributeType=S AttributeName=local_estado,AttributeType=S AttributeName=local_base,AttributeType=S AttributeName=updated_at,AttributeType=S \
     --key-schema AttributeName=local_id,KeyType=HASH AttributeName=pedido_id,KeyType=RANGE \
+    --global-secondary-indexes \
+      "IndexName=by_usuario_v2,KeySchema=[{AttributeName=correo,KeyType=HASH},{AttributeName=created_at,KeyType=RANGE}],Projection={ProjectionType=ALL}" \
+      "IndexName=by_local_estado,KeySchema=[{AttributeName=local_estado,KeyType=HASH},{AttributeName=created_at,KeyType=RANGE}],Projection={ProjectionType=INCLUDE,NonKeyAttributes=[estado,productos,direccion,cocinero_dni]}" \
+      "IndexName=by_local_updated,KeySchema=[{AttributeName=local_base,KeyType=HASH},{AttributeName=updated_at,KeyType=RANGE}],Projection={ProjectionType=INCLUDE,NonKeyAttributes=[estado,created_at,productos,direccion,cocinero_dni]}" \
+    --stream-specification StreamEnabled=true,StreamViewType=NEW_AND_OLD_IMAGES \
     --billing-mode PAY_PER_REQUEST \
     --region "${AWS_REGION}" 2>/dev/null || echo "   Tabla ${TABLE_PEDIDOS} ya existe"
   
@@ -177,6 +190,74 @@ create_dynamodb_tables() {
     --billing-mode PAY_PER_REQUEST \
     --region "${AWS_REGION}" 2>/dev/null || echo "   Tabla ${TABLE_TOKENS_USUARIOS} ya existe"
   
+  # Tabla Idempotencia (POST /pedido/create, con TTL)
+  aws dynamodb create-table \
+    --table-name "${TABLE_IDEMPOTENCIA}" \
+    --attribute-definitions AttributeName=idempotency_key,AttributeType=S \
+    --key-schema AttributeName=idempotency_key,KeyType=HASH \
+    --billing-mode PAY_PER_REQUEST \
+    --region "${AWS_REGION}" 2>/dev/null || echo "   Tabla ${TABLE_IDEMPOTENCIA} ya existe"
+  aws dynamodb update-time-to-live \
+    --table-name "${TABLE_IDEMPOTENCIA}" \
+    --time-to-live-specification Enabled=true,AttributeName=expires_at \
+    --region "${AWS_REGION}" >/dev/null 2>&1 || true
+  
+  # Tablas WebSocket (conexiones y suscripciones por pedido, con TTL)
+  aws dynamodb create-table \
+    --table-name "${TABLE_WS_CONEXIONES}" \
+    --attribute-definitions AttributeName=connection_id,AttributeType=S \
+    --key-schema AttributeName=connection_id,KeyType=HASH \
+    --billing-mode PAY_PER_REQUEST \
+    --region "${AWS_REGION}" 2>/dev/null || echo "   Tabla ${TABLE_WS_CONEXIONES} ya existe"
+  aws dynamodb create-table \
+    --table-name "${TABLE_WS_SUSCRIPCIONES}" \
+    --attribute-definitions AttributeName=pedido_id,AttributeType=S AttributeName=connection_id,AttributeType=S \
+    --key-schema AttributeName=pedido_id,KeyType=HASH AttributeName=connection_id,KeyType=RANGE \
+    --billing-mode PAY_PER_REQUEST \
+    --region "${AWS_REGION}" 2>/dev/null || echo "   Tabla ${TABLE_WS_SUSCRIPCIONES} ya existe"
+  for ws_table in "${TABLE_WS_CONEXIONES}" "${TABLE_WS_SUSCRIPCIONES}"; do
+    aws dynamodb update-time-to-live \
+      --table-name "${ws_table}" \
+      --time-to-live-specification Enabled=true,AttributeName=expires_at \
+      --region "${AWS_REGION}" >/dev/null 2>&1 || true
+  done
+  
+  # Estado actual por pedido (puntero al historial, transiciones atómicas)
+  aws dynamodb create-table \
+    --table-name "${TABLE_ESTADO_ACTUAL}" \
+    --attribute-definitions AttributeName=pedido_id,AttributeType=S \
+    --key-schema AttributeName=pedido_id,KeyType=HASH \
+    --billing-mode PAY_PER_REQUEST \
+    --region "${AWS_REGION}" 2>/dev/null || echo "   Tabla ${TABLE_ESTADO_ACTUAL} ya existe"
+  
+  # Caché de geocodificación (opcional, lotes de delivery)
+  if [ -n "${TABLE_GEOCACHE:-}" ]; then
+    aws dynamodb create-table \
+      --table-name "${TABLE_GEOCACHE}" \
+      --attribute-definitions AttributeName=direccion,AttributeType=S \
+      --key-schema AttributeName=direccion,KeyType=HASH \
+      --billing-mode PAY_PER_REQUEST \
+      --region "${AWS_REGION}" 2>/dev/null || echo "   Tabla ${TABLE_GEOCACHE} ya existe"
+    aws dynamodb update-time-to-live \
+      --table-name "${TABLE_GEOCACHE}" \
+      --time-to-live-specification Enabled=true,AttributeName=expires_at \
+      --region "${AWS_REGION}" >/dev/null 2>&1 || true
+  fi
+  
+  # Presupuesto de reintentos por local (opcional, ventanas con TTL)
+  if [ -n "${TABLE_RETRY_BUDGET:-}" ]; then
+    aws dynamodb create-table \
+      --table-name "${TABLE_RETRY_BUDGET}" \
+      --attribute-definitions AttributeName=local_id,AttributeType=S AttributeName=ventana,AttributeType=N \
+      --key-schema AttributeName=local_id,KeyType=HASH AttributeName=ventana,KeyType=RANGE \
+      --billing-mode PAY_PER_REQUEST \
+      --region "${AWS_REGION}" 2>/dev/null || echo "   Tabla ${TABLE_RETRY_BUDGET} ya existe"
+    aws dynamodb update-time-to-live \
+      --table-name "${TABLE_RETRY_BUDGET}" \
+      --time-to-live-specification Enabled=true,AttributeName=expires_at \
+      --region "${AWS_REGION}" >/dev/null 2>&1 || true
+  fi
+  
   echo -e "${GREEN}✅ Tablas DynamoDB creadas${NC}"
   
   # Esperar a que las tablas estén activas
@@ -508,6 +589,16 @@ remove_infrastructure() {
   aws dynamodb delete-table --table-name "${TABLE_PEDIDOS}" --region "${AWS_REGION}" 2>/dev/null || echo "   Tabla ${TABLE_PEDIDOS} no existe"
   aws dynamodb delete-table --table-name "${TABLE_HISTORIAL_ESTADOS}" --region "${AWS_REGION}" 2>/dev/null || echo "   Tabla ${TABLE_HISTORIAL_ESTADOS} no existe"
   aws dynamodb delete-table --table-name "${TABLE_TOKENS_USUARIOS}" --region "${AWS_REGION}" 2>/dev/null || echo "   Tabla ${TABLE_TOKENS_USUARIOS} no existe"
+  aws dynamodb delete-table --table-name "${TABLE_IDEMPOTENCIA}" --region "${AWS_REGION}" 2>/dev/null || echo "   Tabla ${TABLE_IDEMPOTENCIA} no existe"
+  aws dynamodb delete-table --table-name "${TABLE_WS_CONEXIONES}" --region "${AWS_REGION}" 2>/dev/null || echo "   Tabla ${TABLE_WS_CONEXIONES} no existe"
+  aws dynamodb delete-table --table-name "${TABLE_WS_SUSCRIPCIONES}" --region "${AWS_REGION}" 2>/dev/null || echo "   Tabla ${TABLE_WS_SUSCRIPCIONES} no existe"
+  aws dynamodb delete-table --table-name "${TABLE_ESTADO_ACTUAL}" --region "${AWS_REGION}" 2>/dev/null || echo "   Tabla ${TABLE_ESTADO_ACTUAL} no existe"
+  if [ -n "${TABLE_GEOCACHE:-}" ]; then
+    aws dynamodb delete-table --table-name "${TABLE_GEOCACHE}" --region "${AWS_REGION}" 2>/dev/null || echo "   Tabla ${TABLE_GEOCACHE} no existe"
+  fi
+  if [ -n "${TABLE_RETRY_BUDGET:-}" ]; then
+    aws dynamodb delete-table --table-name "${TABLE_RETRY_BUDGET}" --region "${AWS_REGION}" 2>/dev/null || echo "   Tabla ${TABLE_RETRY_BUDGET} no existe"
+  fi
   
   # 2) Eliminar bucket de imágenes
   if [[ -n "${S3_BUCKET_NAME:-}" ]]; then
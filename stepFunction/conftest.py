@@ -0,0 +1 @@
+# Lets tests import the Lambda packages (handlers.*) the way the runtime does
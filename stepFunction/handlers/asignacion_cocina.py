@@ -0,0 +1,46 @@
+import os
+import boto3
+from botocore.exceptions import ClientError
+from handlers.pedidos_keys import update_pedido
+
+TABLE_PEDIDOS = os.environ.get('TABLE_PEDIDOS')
+# Cooks' open orders (pedidos_en_curso) written by the kitchen scheduler in servicio-empleados
+TABLE_EMPLEADOS = os.environ.get('TABLE_EMPLEADOS')
+
+dynamodb = boto3.resource('dynamodb')
+
+
+def liberar_cocinero(local_id, order_id):
+    """
+    Undoes the scheduler's reservation when the kitchen stage is retried or fails:
+    clears cocinero_dni / asignado_at on the order (so any cook can take it again)
+    and frees the slot in the cook's pedidos_en_curso. Best effort, returns the dni released.
+    """
+    if not TABLE_PEDIDOS:
+        return None
+    try:
+        r = update_pedido(
+            dynamodb.Table(TABLE_PEDIDOS), local_id, order_id,
+            UpdateExpression='REMOVE cocinero_dni, asignado_at',
+            ConditionExpression='attribute_exists(cocinero_dni)',
+            ReturnValues='UPDATED_OLD'
+        )
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            print(f"⚠️ Could not clear kitchen assignment of {order_id}: {e}")
+        return None
+
+    dni = r.get('Attributes', {}).get('cocinero_dni')
+    if dni and TABLE_EMPLEADOS:
+        try:
+            dynamodb.Table(TABLE_EMPLEADOS).update_item(
+                Key={'local_id': local_id, 'dni': dni},
+                UpdateExpression='DELETE pedidos_en_curso :p',
+                ConditionExpression='attribute_exists(dni)',
+                ExpressionAttributeValues={':p': {order_id}}
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                print(f"⚠️ Could not free {dni}'s slot for {order_id}: {e}")
+    print(f"🔓 Kitchen assignment of {order_id} released (cook {dni})")
+    return dni
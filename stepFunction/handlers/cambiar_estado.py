@@ -1,12 +1,24 @@
 import json
-import os
 import boto3
-from boto3.dynamodb.conditions import Key
 from decimal import Decimal
+from botocore.exceptions import ClientError
+from handlers.transicion_estado import get_estado_actual, consumir_token, devolver_token
+from handlers.contexto import compactar
 
-dynamodb = boto3.resource('dynamodb')
 stepfunctions = boto3.client('stepfunctions')
-TABLE_HISTORIAL_ESTADOS = os.environ['TABLE_HISTORIAL_ESTADOS']
+
+# Estado whose task token each event resolves (the stage that is waiting for it)
+ESTADO_ESPERADO = {
+    'EnPreparacion': 'procesando',
+    'CocinaCompleta': 'en_preparacion',
+    'Empaquetado': 'cocina_completa',
+    'PedidoEnCamino': 'empaquetando',
+    'EntregaDelivery': 'pedido_en_camino',
+    'ConfirmarPedidoCliente': 'entrega_delivery'
+}
+
+# The token can no longer be used: do not hand it back
+TOKEN_CERRADO = ('TaskTimedOut', 'TaskDoesNotExist', 'InvalidToken')
 
 def decimal_to_number(obj):
     """Convert Decimal objects to int or float for JSON serialization"""
@@ -40,53 +52,56 @@ def handler(event, context):
             'body': json.dumps({'error': 'No order_id in event'})
         }
     
-    # Map Event Type to Expected Status in DB to find the token
-    # We need to find the LATEST token for this order.
-    # The table has (id_pedido, createdAt).
-    
-    table = dynamodb.Table(TABLE_HISTORIAL_ESTADOS)
-    
-    # Query all history for this order
-    response = table.query(
-        KeyConditionExpression=Key('pedido_id').eq(order_id),
-        ScanIndexForward=False, # Descending order (newest first)
-        Limit=1
-    )
-    
-    items = response.get('Items', [])
-    if not items:
+    # Current-state pointer: one strongly consistent GetItem holds the latest
+    # estado, its task token and the stored context (retry_count, local_id)
+    actual = get_estado_actual(order_id)
+    if not actual:
         print(f"No history found for order {order_id}")
         return
     
-    latest_item = items[0]
-    task_token = latest_item.get('taskToken')
-    current_estado = latest_item.get('estado')
+    task_token = actual.get('taskToken')
+    current_estado = actual.get('estado')
     
     if not task_token:
-        print(f"No task token found in latest state ({current_estado}) for order {order_id}")
-        return
+        # Token already consumed: double tap or EventBridge redelivery, acknowledge it
+        print(f"No task token in current state ({current_estado}) for order {order_id}; duplicate ignored")
+        return {
+            'statusCode': 200,
+            'body': json.dumps({'message': 'Duplicate event ignored', 'order_id': order_id})
+        }
+    
+    esperado = ESTADO_ESPERADO.get(detail_type)
+    if esperado and current_estado != esperado:
+        # The event belongs to another stage: never advance the one that is waiting now
+        print(f"⚠️ {detail_type} expects estado {esperado} but order {order_id} is in {current_estado}; ignored")
+        return {
+            'statusCode': 409,
+            'body': json.dumps({'error': f'{detail_type} does not match estado {current_estado}', 'order_id': order_id})
+        }
+    
+    # Conditional consume: only one invocation per token gets past this point
+    if not consumir_token(actual):
+        print(f"Token for order {order_id} ({current_estado}) already consumed; duplicate ignored")
+        return {
+            'statusCode': 200,
+            'body': json.dumps({'message': 'Duplicate event ignored', 'order_id': order_id})
+        }
     
     print(f"Found token for order {order_id} in estado {current_estado}. Triggering SF...")
     
-    # Retrieve stored input/details to preserve context (like retry_count and local_id)
-    stored_data = latest_item.get('details') or {}
-    retry_count = stored_data.get('retry_count', 0) if isinstance(stored_data, dict) else 0
-    local_id = stored_data.get('local_id') if isinstance(stored_data, dict) else None
+    contexto = actual.get('contexto') or {}
+    retry_count = contexto.get('retry_count', 0)
+    local_id = contexto.get('local_id')
     
-    # Determine output status based on event
+    # Determine output status based on event. Only the compact context goes back to
+    # the workflow: the event detail is not forwarded, so stage payloads do not nest
     output_payload = {
-        "order_id": order_id,
+        **compactar(order_id, local_id or 'UNKNOWN', decimal_to_number(retry_count)),
         "event": detail_type,
         "status": detail.get('status', 'ACEPTADO'), # Default to Accepted if not specified
-        "retry_count": decimal_to_number(retry_count), # Convert Decimal to number
-        "empleado_id": detail.get('empleado_id', 'UNKNOWN'),
-        "details": decimal_to_number(detail) # Convert any Decimals in details
+        "empleado_id": detail.get('empleado_id', 'UNKNOWN')
     }
-    
-    # Add local_id if available
-    if local_id:
-        output_payload['local_id'] = local_id
-        print(f"📍 Passing local_id: {local_id}")
+    print(f"📍 Passing local_id: {output_payload['local_id']}")
     
     try:
         print(f"📤 Sending task success with payload: {json.dumps(output_payload, indent=2)}")
@@ -99,10 +114,21 @@ def handler(event, context):
             'statusCode': 200,
             'body': json.dumps({'message': 'Task success sent', 'order_id': order_id})
         }
+    except ClientError as e:
+        codigo = e.response['Error']['Code']
+        print(f"❌ Error sending task success: {codigo} {e}")
+        if codigo not in TOKEN_CERRADO:
+            # Step Functions never got it: give the token back so a retry of the event can use it
+            devolver_token(actual)
+        return {
+            'statusCode': 410 if codigo in TOKEN_CERRADO else 500,
+            'body': json.dumps({'error': str(e), 'order_id': order_id})
+        }
     except Exception as e:
         print(f"❌ Error sending task success: {e}")
         import traceback
         traceback.print_exc()
+        devolver_token(actual)
         return {
             'statusCode': 500,
             'body': json.dumps({'error': str(e), 'order_id': order_id})
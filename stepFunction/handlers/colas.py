@@ -0,0 +1,31 @@
+import json
+import hashlib
+import boto3
+
+sqs = boto3.client('sqs')
+
+
+def dedup_id(order_id, action, retry_count=0):
+    """Same (order_id, action, retry_count) -> same id: SQS drops the repeat within 5 minutes"""
+    clave = f"{order_id}|{action}|{int(retry_count or 0)}"
+    return hashlib.sha256(clave.encode('utf-8')).hexdigest()
+
+
+def enviar(queue_url, message_body, local_id, dedup=None):
+    """
+    Sends a workflow message. On FIFO queues (.fifo) the local is the message group:
+    orders of one local keep their order, different locales are consumed in parallel.
+    dedup overrides the (order_id, action, retry_count) id for multi-order messages.
+    """
+    kwargs = {
+        'QueueUrl': queue_url,
+        'MessageBody': json.dumps(message_body)
+    }
+    if queue_url.endswith('.fifo'):
+        kwargs['MessageGroupId'] = local_id or 'UNKNOWN'
+        kwargs['MessageDeduplicationId'] = dedup or dedup_id(
+            message_body.get('order_id'),
+            message_body.get('action'),
+            message_body.get('retry_count', 0)
+        )
+    return sqs.send_message(**kwargs)
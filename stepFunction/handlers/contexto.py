@@ -0,0 +1,44 @@
+import os
+import boto3
+from handlers.pedidos_keys import get_pedido
+
+dynamodb = boto3.resource('dynamodb')
+TABLE_PEDIDOS = os.environ.get('TABLE_PEDIDOS')
+
+# Workflow context passed between stages, SQS messages and historial rows.
+# The order payload (productos, direccion, ...) lives only in Pedidos and is
+# loaded on demand with hidratar(); bump the version if the shape changes.
+CONTEXTO_VERSION = 1
+
+
+def compactar(order_id, local_id, retry_count=0):
+    return {
+        'order_id': order_id,
+        'local_id': local_id,
+        'retry_count': int(retry_count or 0),
+        'v': CONTEXTO_VERSION
+    }
+
+
+def contexto_de(input_data):
+    """Compact context from any stage input (also accepts pre-v1 nested payloads)"""
+    details = input_data.get('details')
+    details = details if isinstance(details, dict) else {}
+    order_id = (
+        input_data.get('order_id') or
+        input_data.get('pedido_id') or
+        input_data.get('detail', {}).get('order_id')
+    )
+    local_id = (
+        input_data.get('local_id') or
+        details.get('local_id') or
+        'UNKNOWN'
+    )
+    return compactar(order_id, local_id, input_data.get('retry_count', 0))
+
+
+def hidratar(ctx):
+    """Order row from Pedidos, read only by the stages that actually need it"""
+    if not TABLE_PEDIDOS:
+        return {}
+    return get_pedido(dynamodb.Table(TABLE_PEDIDOS), ctx['local_id'], ctx['order_id']) or {}
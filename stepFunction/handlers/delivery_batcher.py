@@ -0,0 +1,217 @@
+import json
+import os
+import time
+import hashlib
+from collections import defaultdict
+import boto3
+from botocore.exceptions import ClientError
+from handlers.colas import enviar
+from handlers.contexto import TABLE_PEDIDOS, compactar, hidratar
+from handlers.pedidos_keys import PEDIDOS_SHARDS, pedido_key
+from handlers.geo import Geocoder, geohash, ruta
+
+dynamodb = boto3.resource('dynamodb')
+QUEUE_DELIVERY_URL = os.environ['QUEUE_DELIVERY_URL']
+TABLE_LOCALES = os.environ.get('TABLE_LOCALES')
+# The per-order "batched" marker lives in the current-state pointer (reset by the next transition)
+TABLE_ESTADO_ACTUAL = os.environ['TABLE_ESTADO_ACTUAL']
+# A reservation older than this belongs to an invocation that died before sending its job
+LOTE_RESERVA_SEGUNDOS = 300
+# Orders in one geohash cell of a local travel together (precision 6 ~ 1.2 km)
+DELIVERY_GEOHASH_PRECISION = int(os.environ.get('DELIVERY_GEOHASH_PRECISION', '6'))
+# Orders a repartidor carries per trip
+DELIVERY_MAX_PEDIDOS_POR_VIAJE = int(os.environ.get('DELIVERY_MAX_PEDIDOS_POR_VIAJE', '3'))
+BATCH_GET_MAX = 100  # keys per BatchGetItem
+MAX_INTENTOS = 3
+
+geocoder = Geocoder()
+_origenes = {}
+
+
+def _origen(local_id):
+    """Coordinates of the local (route start), cached per container"""
+    if local_id not in _origenes:
+        direccion = None
+        if TABLE_LOCALES:
+            item = dynamodb.Table(TABLE_LOCALES).get_item(Key={'local_id': local_id}).get('Item') or {}
+            direccion = item.get('direccion')
+        _origenes[local_id] = geocoder.geocodificar(direccion)
+    return _origenes[local_id]
+
+
+def _job_id(pedidos):
+    clave = '|'.join(sorted(f"{p['order_id']}:{p['retry_count']}" for p in pedidos))
+    return hashlib.sha256(clave.encode('utf-8')).hexdigest()[:32]
+
+
+def _direcciones(ctxs):
+    """
+    direccion of every order with BatchGetItem instead of one get_item per record.
+    Orders not found under their sharded key (unmigrated rows) or left in UnprocessedKeys
+    fall back to hidratar.
+    """
+    direcciones = {}
+    if not TABLE_PEDIDOS or not ctxs:
+        return direcciones
+    por_id = {c['order_id']: c for c in ctxs}
+    ids = list(por_id)
+    pendientes = False
+    for i in range(0, len(ids), BATCH_GET_MAX):
+        request = {TABLE_PEDIDOS: {
+            'Keys': [pedido_key(por_id[o]['local_id'], o) for o in ids[i:i + BATCH_GET_MAX]],
+            'ProjectionExpression': 'pedido_id, direccion'
+        }}
+        for intento in range(MAX_INTENTOS):
+            r = dynamodb.batch_get_item(RequestItems=request)
+            for item in r.get('Responses', {}).get(TABLE_PEDIDOS, []):
+                direcciones[item['pedido_id']] = item.get('direccion')
+            request = r.get('UnprocessedKeys') or None
+            if not request:
+                break
+            time.sleep(0.05 * (2 ** intento))
+        pendientes = pendientes or bool(request)
+    for order_id in ids:
+        if order_id not in direcciones and (PEDIDOS_SHARDS > 1 or pendientes):
+            direcciones[order_id] = hidratar(por_id[order_id]).get('direccion')
+    return direcciones
+
+
+def _reservar(order_id, job_id):
+    """
+    Claims the order for job_id on the pointer. Cola_Delivery_Lotes is at-least-once and a
+    redelivered order may land in another trip (another job_id, so FIFO dedup cannot help).
+    Returns 'OK', 'ENVIADO' (already in a sent job: drop it) or 'OCUPADO' (another
+    invocation is sending it right now: retry the message later).
+    """
+    ahora = int(time.time())
+    tabla = dynamodb.Table(TABLE_ESTADO_ACTUAL)
+    try:
+        tabla.update_item(
+            Key={'pedido_id': order_id},
+            UpdateExpression='SET lote_job = :job, lote_estado = :reservado, lote_at = :ahora',
+            ConditionExpression=(
+                'attribute_exists(pedido_id) AND (attribute_not_exists(lote_job) OR lote_job = :job'
+                ' OR (lote_estado = :reservado AND lote_at < :vencido))'
+            ),
+            ExpressionAttributeValues={
+                ':job': job_id,
+                ':reservado': 'RESERVADO',
+                ':ahora': ahora,
+                ':vencido': ahora - LOTE_RESERVA_SEGUNDOS
+            }
+        )
+        return 'OK'
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            print(f"⚠️ Could not reserve {order_id} for {job_id}: {e}")
+            return 'OCUPADO'
+    actual = tabla.get_item(Key={'pedido_id': order_id}, ConsistentRead=True).get('Item')
+    if actual is None:
+        return 'OK'  # no pointer (legacy order): nothing to guard with
+    return 'ENVIADO' if actual.get('lote_estado') == 'ENVIADO' else 'OCUPADO'
+
+
+def _marcar(viaje, job_id, enviado):
+    """ENVIADO once the job is in Cola_Delivery; on a failed send the reservation is dropped"""
+    tabla = dynamodb.Table(TABLE_ESTADO_ACTUAL)
+    for p in viaje:
+        kwargs = {
+            'Key': {'pedido_id': p['order_id']},
+            'ConditionExpression': 'lote_job = :job',
+        }
+        if enviado:
+            kwargs['UpdateExpression'] = 'SET lote_estado = :enviado'
+            kwargs['ExpressionAttributeValues'] = {':job': job_id, ':enviado': 'ENVIADO'}
+        else:
+            kwargs['UpdateExpression'] = 'REMOVE lote_job, lote_estado, lote_at'
+            kwargs['ExpressionAttributeValues'] = {':job': job_id}
+        try:
+            tabla.update_item(**kwargs)
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                print(f"⚠️ Could not update batch marker of {p['order_id']}: {e}")
+
+
+def handler(event, context):
+    """
+    Delivery batching stage (SQS event source with a batching window).
+    delivery.py persists each order's transition and token, then parks it here; orders
+    of the same local and geohash cell are emitted as one job to Cola_Delivery with a
+    route order. Repartidores still fire PedidoEnCamino / EntregaDelivery per order.
+    """
+    records = event.get('Records', [])
+    print(f"DeliveryBatcher: {len(records)} order(s)")
+
+    # A malformed record only fails itself (ReportBatchItemFailures), never the whole batch
+    fallidos, leidos = [], []
+    for r in records:
+        try:
+            body = json.loads(r['body'])
+            ctx = body.get('details') or {}
+            ctx = compactar(body.get('order_id') or ctx.get('order_id'), ctx.get('local_id') or 'UNKNOWN', body.get('retry_count', 0))
+            if not ctx['order_id']:
+                raise ValueError('order_id missing')
+            leidos.append((r['messageId'], ctx))
+        except Exception as e:
+            print(f"❌ Unreadable record {r.get('messageId')}: {e}")
+            fallidos.append(r['messageId'])
+
+    try:
+        direcciones = _direcciones([ctx for _, ctx in leidos])
+    except Exception as e:
+        # Without addresses nothing can be grouped: let SQS redeliver the batch
+        print(f"❌ Could not load order addresses: {e}")
+        return {"batchItemFailures": [{"itemIdentifier": r['messageId']} for r in records]}
+
+    grupos = defaultdict(list)
+    for message_id, ctx in leidos:
+        try:
+            direccion = direcciones.get(ctx['order_id'])
+            punto = geocoder.geocodificar(direccion)
+            pedido = dict(ctx, message_id=message_id, direccion=direccion, punto=punto)
+            # Orders that cannot be geocoded are not batched with anyone
+            celda = geohash(punto[0], punto[1], DELIVERY_GEOHASH_PRECISION) if punto else f"sin-geo-{ctx['order_id']}"
+            grupos[(ctx['local_id'], celda)].append(pedido)
+        except Exception as e:
+            print(f"❌ Could not geocode order {ctx['order_id']}: {e}")
+            fallidos.append(message_id)
+
+    for (local_id, celda), pedidos in grupos.items():
+        origen = _origen(local_id)
+        for i in range(0, len(pedidos), DELIVERY_MAX_PEDIDOS_POR_VIAJE):
+            viaje = pedidos[i:i + DELIVERY_MAX_PEDIDOS_POR_VIAJE]
+            job_id = _job_id(viaje)
+            # One job per order: redelivered orders already sent are dropped, the ones
+            # being sent by another invocation come back later
+            reservas = {p['order_id']: _reservar(p['order_id'], job_id) for p in viaje}
+            fallidos.extend(p['message_id'] for p in viaje if reservas[p['order_id']] == 'OCUPADO')
+            duplicados = [p['order_id'] for p in viaje if reservas[p['order_id']] == 'ENVIADO']
+            if duplicados:
+                print(f"♻️ Already in a sent delivery job, skipped: {duplicados}")
+            viaje = [p for p in viaje if reservas[p['order_id']] == 'OK']
+            if not viaje:
+                continue
+            con_punto = [(p['order_id'], p['punto']) for p in viaje if p['punto']]
+            orden = ruta(origen, con_punto) + [p['order_id'] for p in viaje if not p['punto']]
+            message_body = {
+                "job_id": job_id,
+                "action": "DELIVERY_LOTE",
+                "local_id": local_id,
+                "geohash": None if celda.startswith('sin-geo') else celda,
+                "ruta": orden,
+                "pedidos": [
+                    {"order_id": p['order_id'], "retry_count": p['retry_count'], "direccion": p['direccion']}
+                    for p in viaje
+                ]
+            }
+            try:
+                enviar(QUEUE_DELIVERY_URL, message_body, local_id, dedup=job_id)
+            except Exception as e:
+                print(f"❌ Error sending delivery job {job_id}: {e}")
+                _marcar(viaje, job_id, enviado=False)
+                fallidos.extend(p['message_id'] for p in viaje)
+                continue
+            _marcar(viaje, job_id, enviado=True)
+
+    print(f"✅ {len(records) - len(fallidos)} order(s) batched into {len(grupos)} cell(s); {len(fallidos)} failed")
+    return {"batchItemFailures": [{"itemIdentifier": mid} for mid in fallidos]}
@@ -0,0 +1,118 @@
+import os
+import math
+import time
+from collections import OrderedDict
+from decimal import Decimal
+import boto3
+
+# Amazon Location place index used to geocode free-text addresses (empty = no geocoding)
+GEOCODER_PLACE_INDEX = os.environ.get('GEOCODER_PLACE_INDEX', '')
+# Shared cache between containers (PK direccion, TTL expires_at); empty = in-memory only
+TABLE_GEOCACHE = os.environ.get('TABLE_GEOCACHE', '')
+GEOCACHE_SIZE = int(os.environ.get('GEOCACHE_SIZE', '2048'))
+GEOCACHE_TTL_DAYS = int(os.environ.get('GEOCACHE_TTL_DAYS', '30'))
+
+_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+
+def geohash(lat, lon, precision=6):
+    """Standard geohash (precision 6 ~ 1.2 km x 0.6 km cells)"""
+    lat_rng, lon_rng = [-90.0, 90.0], [-180.0, 180.0]
+    out, bits, ch, even = [], 0, 0, True
+    while len(out) < precision:
+        rng, val = (lon_rng, lon) if even else (lat_rng, lat)
+        mid = (rng[0] + rng[1]) / 2
+        if val >= mid:
+            ch = (ch << 1) | 1
+            rng[0] = mid
+        else:
+            ch <<= 1
+            rng[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            out.append(_BASE32[ch])
+            bits, ch = 0, 0
+    return ''.join(out)
+
+
+def distancia_km(a, b):
+    """Haversine distance between (lat, lon) points"""
+    lat1, lon1, lat2, lon2 = map(math.radians, (a[0], a[1], b[0], b[1]))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * 6371.0 * math.asin(math.sqrt(h))
+
+
+def ruta(origen, paradas):
+    """
+    Visit order for a delivery job: nearest neighbour starting at origen.
+    paradas: [(id, (lat, lon))]. Without an origin the first stop starts the route.
+    """
+    pendientes = list(paradas)
+    if not pendientes:
+        return []
+    actual = origen or pendientes[0][1]
+    orden = []
+    while pendientes:
+        siguiente = min(pendientes, key=lambda p: distancia_km(actual, p[1]))
+        pendientes.remove(siguiente)
+        orden.append(siguiente[0])
+        actual = siguiente[1]
+    return orden
+
+
+def _normalizar(direccion):
+    return ' '.join(str(direccion).lower().split())
+
+
+class Geocoder:
+    """Address -> (lat, lon) with an LRU per container and an optional shared DynamoDB tier."""
+
+    def __init__(self, place_index=GEOCODER_PLACE_INDEX, table_name=TABLE_GEOCACHE, size=GEOCACHE_SIZE):
+        self._place_index = place_index
+        self._table = boto3.resource('dynamodb').Table(table_name) if table_name else None
+        self._location = boto3.client('location') if place_index else None
+        self._size = size
+        self._lru = OrderedDict()
+
+    def _recordar(self, clave, punto):
+        self._lru[clave] = punto
+        self._lru.move_to_end(clave)
+        while len(self._lru) > self._size:
+            self._lru.popitem(last=False)
+
+    def geocodificar(self, direccion):
+        """(lat, lon) or None when the address cannot be resolved"""
+        if not direccion:
+            return None
+        clave = _normalizar(direccion)
+        if clave in self._lru:
+            self._lru.move_to_end(clave)
+            return self._lru[clave]
+
+        punto = None
+        if self._table is not None:
+            item = self._table.get_item(Key={'direccion': clave}).get('Item')
+            if item:
+                punto = (float(item['lat']), float(item['lon']))
+
+        if punto is None and self._location is not None:
+            try:
+                r = self._location.search_place_index_for_text(IndexName=self._place_index, Text=direccion, MaxResults=1)
+                resultados = r.get('Results', [])
+                if resultados:
+                    lon, lat = resultados[0]['Place']['Geometry']['Point']
+                    punto = (lat, lon)
+                    if self._table is not None:
+                        self._table.put_item(Item={
+                            'direccion': clave,
+                            'lat': Decimal(str(lat)),
+                            'lon': Decimal(str(lon)),
+                            'expires_at': int(time.time()) + GEOCACHE_TTL_DAYS * 86400
+                        })
+            except Exception as e:
+                print(f"⚠️ Geocoding failed for '{direccion}': {e}")
+
+        if punto is not None:
+            self._recordar(clave, punto)
+        return punto
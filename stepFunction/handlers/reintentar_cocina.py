@@ -1,51 +1,42 @@
 import json
-import os
-import boto3
-from datetime import datetime
-
-dynamodb = boto3.resource('dynamodb')
-sqs = boto3.client('sqs')
-TABLE_HISTORIAL_ESTADOS = os.environ['TABLE_HISTORIAL_ESTADOS']
-QUEUE_COCINA_URL = os.environ['QUEUE_COCINA_URL']
+from handlers.transicion_estado import transicionar
+from handlers.contexto import contexto_de
+from handlers.asignacion_cocina import liberar_cocinero
+from handlers.reintentos import MAX_REINTENTOS, espera_backoff, consumir_presupuesto
 
 def handler(event, context):
     print(f"ReintentarCocina Event: {json.dumps(event)}")
     
     # This is a Task state (not wait), so event is just the input
     input_data = event.get('input', {})
-    order_id = input_data.get('order_id')
-    retry_count = input_data.get('retry_count', 0) + 1
+    ctx = contexto_de(input_data)
+    ctx['retry_count'] += 1
+    order_id, local_id, retry_count = ctx['order_id'], ctx['local_id'], ctx['retry_count']
+    # Past the limit the Choice fails the order anyway: do not spend the local's budget on it
+    presupuesto_ok = consumir_presupuesto(local_id) if retry_count <= MAX_REINTENTOS else True
+    espera = espera_backoff(retry_count)
+    # Reached from a rejection (EvaluarCocina) or from the stage's
+    # Catch when the employee client stopped sending heartbeats
+    sin_heartbeat = (input_data.get('error') or {}).get('Error') == 'States.HeartbeatTimeout'
+    motivo = "Sin heartbeat del empleado - " if sin_heartbeat else ""
     
-    # Re-enqueue to SQS Cocina
-    message_body = {
-        "order_id": order_id,
-        "action": "COCINAR_RETRY",
-        "retry_count": retry_count,
-        "details": input_data
-    }
-    sqs.send_message(
-        QueueUrl=QUEUE_COCINA_URL,
-        MessageBody=json.dumps(message_body)
+    # Log retry: historial row + pointer (drops the consumed token), Pedidos untouched.
+    # No message here: after the backoff Wait, ProcesarPedido stores its token and re-enqueues
+    transicionar(
+        order_id, local_id, 'procesando', 'SYSTEM_RETRY',
+        f"Reintento {retry_count} - {motivo}Re-encolando para cocina en {espera}s" if presupuesto_ok
+        else f"Reintento {retry_count} - Presupuesto de reintentos del local agotado",
+        contexto={'local_id': local_id, 'retry_count': retry_count},
+        solo_historial=True
     )
     
-    # Log retry
-    table = dynamodb.Table(TABLE_HISTORIAL_ESTADOS)
-    timestamp = datetime.utcnow().isoformat()
-    
-    item = {
-        'pedido_id': order_id,
-        'estado_id': timestamp,
-        'createdAt': timestamp,
-        'estado': 'procesando',
-        'hora_inicio': timestamp,
-        'empleado': 'SYSTEM_RETRY',
-        'details': f"Reintento {retry_count} - Re-encolando para cocina"
-    }
-    table.put_item(Item=item)
+    # The rejecting / silent cook keeps no claim: the order goes back to every cook of the local
+    liberar_cocinero(local_id, order_id)
     
     return {
-        "order_id": order_id,
-        "retry_count": retry_count,
+        **ctx,
         "status": "RETRYING",
+        "espera_segundos": espera,
+        "presupuesto_agotado": not presupuesto_ok,
         "empleado_id": input_data.get('empleado_id', 'SYSTEM')
     }
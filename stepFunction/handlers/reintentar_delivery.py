@@ -1,49 +1,37 @@
 import json
-import os
-import boto3
-from datetime import datetime
-
-dynamodb = boto3.resource('dynamodb')
-sqs = boto3.client('sqs')
-TABLE_HISTORIAL_ESTADOS = os.environ['TABLE_HISTORIAL_ESTADOS']
-QUEUE_DELIVERY_URL = os.environ['QUEUE_DELIVERY_URL']
+from handlers.transicion_estado import transicionar
+from handlers.contexto import contexto_de
+from handlers.reintentos import MAX_REINTENTOS, espera_backoff, consumir_presupuesto
 
 def handler(event, context):
     print(f"ReintentarDelivery Event: {json.dumps(event)}")
     
     input_data = event.get('input', {})
-    order_id = input_data.get('order_id')
-    retry_count = input_data.get('retry_count', 0) + 1
+    ctx = contexto_de(input_data)
+    ctx['retry_count'] += 1
+    order_id, local_id, retry_count = ctx['order_id'], ctx['local_id'], ctx['retry_count']
+    # Past the limit the Choice fails the order anyway: do not spend the local's budget on it
+    presupuesto_ok = consumir_presupuesto(local_id) if retry_count <= MAX_REINTENTOS else True
+    espera = espera_backoff(retry_count)
+    # Reached from a rejection (EvaluarDelivery) or from the stage's
+    # Catch when the employee client stopped sending heartbeats
+    sin_heartbeat = (input_data.get('error') or {}).get('Error') == 'States.HeartbeatTimeout'
+    motivo = "Sin heartbeat del empleado - " if sin_heartbeat else ""
     
-    # Re-enqueue to SQS Delivery
-    message_body = {
-        "order_id": order_id,
-        "action": "DELIVERY_RETRY",
-        "retry_count": retry_count,
-        "details": input_data
-    }
-    sqs.send_message(
-        QueueUrl=QUEUE_DELIVERY_URL,
-        MessageBody=json.dumps(message_body)
+    # Log retry: historial row + pointer (drops the consumed token), Pedidos untouched.
+    # No message here: after the backoff Wait the Delivery stage re-enqueues (retry_count > 0)
+    transicionar(
+        order_id, local_id, 'enviando', 'SYSTEM_RETRY',
+        f"Reintento {retry_count} - {motivo}Re-encolando para delivery en {espera}s" if presupuesto_ok
+        else f"Reintento {retry_count} - Presupuesto de reintentos del local agotado",
+        contexto={'local_id': local_id, 'retry_count': retry_count},
+        solo_historial=True
     )
     
-    table = dynamodb.Table(TABLE_HISTORIAL_ESTADOS)
-    timestamp = datetime.utcnow().isoformat()
-    
-    item = {
-        'pedido_id': order_id,
-        'estado_id': timestamp,
-        'createdAt': timestamp,
-        'estado': 'enviando',
-        'hora_inicio': timestamp,
-        'empleado': 'SYSTEM_RETRY',
-        'details': f"Reintento {retry_count} - Re-encolando para delivery"
-    }
-    table.put_item(Item=item)
-    
     return {
-        "order_id": order_id,
-        "retry_count": retry_count,
+        **ctx,
         "status": "RETRYING_DELIVERY",
+        "espera_segundos": espera,
+        "presupuesto_agotado": not presupuesto_ok,
         "empleado_id": input_data.get('empleado_id', 'SYSTEM')
     }
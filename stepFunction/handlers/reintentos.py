@@ -0,0 +1,57 @@
+import os
+import random
+import time
+import boto3
+from botocore.exceptions import ClientError
+
+# Backoff between retries: full jitter over base * 2^(retry-1), capped
+RETRY_BACKOFF_BASE_SECONDS = int(os.environ.get('RETRY_BACKOFF_BASE_SECONDS', '5'))
+RETRY_BACKOFF_MAX_SECONDS = int(os.environ.get('RETRY_BACKOFF_MAX_SECONDS', '120'))
+# Same limit as the EvaluarReintento* Choices (retry_count <= 3)
+MAX_REINTENTOS = 3
+# Retries allowed per local within a window (PK local_id, SK ventana, TTL expires_at); empty table = no budget
+TABLE_RETRY_BUDGET = os.environ.get('TABLE_RETRY_BUDGET', '')
+RETRY_BUDGET_POR_LOCAL = int(os.environ.get('RETRY_BUDGET_POR_LOCAL', '20'))
+RETRY_BUDGET_VENTANA_SEGUNDOS = int(os.environ.get('RETRY_BUDGET_VENTANA_SEGUNDOS', '300'))
+
+_table = boto3.resource('dynamodb').Table(TABLE_RETRY_BUDGET) if TABLE_RETRY_BUDGET else None
+
+
+def espera_backoff(retry_count):
+    """
+    Seconds to wait before retry number retry_count (1, 2, 3...).
+    Full jitter spreads the rejected orders of one local instead of retrying them in lockstep.
+    Whole seconds >= 1: the value feeds a Wait state (SecondsPath).
+    """
+    techo = min(RETRY_BACKOFF_MAX_SECONDS, RETRY_BACKOFF_BASE_SECONDS * 2 ** max(int(retry_count) - 1, 0))
+    return max(1, int(random.uniform(0, techo)))
+
+
+def consumir_presupuesto(local_id, ahora=None):
+    """
+    Takes one retry from the local's budget for the current window.
+    False when the local already spent it: the order should fail instead of queueing again.
+    """
+    if _table is None:
+        return True
+    ahora = int(ahora or time.time())
+    ventana = ahora - ahora % RETRY_BUDGET_VENTANA_SEGUNDOS
+    try:
+        _table.update_item(
+            Key={'local_id': local_id or 'UNKNOWN', 'ventana': ventana},
+            UpdateExpression='ADD reintentos :uno SET expires_at = if_not_exists(expires_at, :exp)',
+            ConditionExpression='attribute_not_exists(reintentos) OR reintentos < :max',
+            ExpressionAttributeValues={
+                ':uno': 1,
+                ':max': RETRY_BUDGET_POR_LOCAL,
+                ':exp': ventana + 2 * RETRY_BUDGET_VENTANA_SEGUNDOS
+            }
+        )
+        return True
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+            print(f"⛔ Retry budget exhausted for {local_id} ({RETRY_BUDGET_POR_LOCAL}/{RETRY_BUDGET_VENTANA_SEGUNDOS}s)")
+            return False
+        # Budget is a protection, not a dependency: never block a retry on it
+        print(f"⚠️ Retry budget unavailable: {e}")
+        return True
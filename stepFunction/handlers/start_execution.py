@@ -1,33 +1,54 @@
 import json
 import os
+import re
 import boto3
 import uuid
+from handlers.contexto import compactar
 
 stepfunctions = boto3.client('stepfunctions')
 STATE_MACHINE_ARN = os.environ['STATE_MACHINE_ARN']
 
+def execution_name(order_id, attempt=1):
+    """
+    Deterministic name: a redelivered CrearPedido maps to the same execution and Step
+    Functions rejects the duplicate. Names allow [A-Za-z0-9-_] and up to 80 chars.
+    """
+    safe_id = re.sub(r'[^A-Za-z0-9_-]', '-', str(order_id))
+    return f"Order-{safe_id}-{int(attempt)}"[:80]
+
 def handler(event, context):
     print(f"StartExecution Event: {json.dumps(event)}")
     
     # Event detail contains the order info
     detail = event.get('detail', {})
-    order_id = detail.get('order_id', str(uuid.uuid4()))
+    order_id = detail.get('order_id') or detail.get('pedido_id') or str(uuid.uuid4())
+    
+    # Only the compact context enters the workflow; productos stay in Pedidos
+    execution_input = compactar(order_id, detail.get('local_id', 'UNKNOWN'))
+    
+    # attempt > 1 only when an order is deliberately re-run after its execution ended
+    name = execution_name(order_id, detail.get('attempt', 1))
     
     # Start SF Execution
     try:
         response = stepfunctions.start_execution(
             stateMachineArn=STATE_MACHINE_ARN,
-            name=f"Order-{order_id}-{uuid.uuid4().hex[:4]}",
-            input=json.dumps(detail)
+            name=name,
+            input=json.dumps(execution_input)
         )
         print(f"Started execution: {response['executionArn']}")
         return {
             "statusCode": 200,
             "body": json.dumps({"executionArn": response['executionArn']})
         }
-    except Exception as e:
-        print(f"Error starting execution: {e}")
+    except stepfunctions.exceptions.ExecutionAlreadyExists:
+        # Redelivery of an order that is already running (or ran): nothing to do
+        print(f"⚠️ Execution {name} already exists, skipping duplicate start")
         return {
-            "statusCode": 500,
-            "body": json.dumps({"error": str(e)})
+            "statusCode": 200,
+            "body": json.dumps({"executionName": name, "duplicate": True})
         }
+    except Exception as e:
+        # Raise so the async invocation is retried: the deterministic name makes it safe
+        print(f"Error starting execution: {e}")
+        raise
@@ -0,0 +1,219 @@
+import os
+import time
+import boto3
+from datetime import datetime, timezone
+from boto3.dynamodb.conditions import Key
+from botocore.exceptions import ClientError
+from handlers.pedidos_keys import PEDIDOS_SHARDS, pedido_key, set_estado_kwargs
+
+dynamodb = boto3.resource('dynamodb')
+# The resource's client serializes plain Python values, transact_write_items included
+dynamodb_client = dynamodb.meta.client
+
+TABLE_HISTORIAL_ESTADOS = os.environ['TABLE_HISTORIAL_ESTADOS']
+TABLE_PEDIDOS = os.environ.get('TABLE_PEDIDOS')
+# Current-state pointer: one item per order (PK pedido_id) with the open estado_id,
+# its task token and the workflow context. Historial rows no longer carry the token.
+TABLE_ESTADO_ACTUAL = os.environ['TABLE_ESTADO_ACTUAL']
+
+MAX_INTENTOS = 3
+
+
+def marca_tiempo():
+    """UTC with milliseconds and 'Z', the format of $$.State.EnteredTime used by the v3 native states"""
+    return datetime.now(timezone.utc).isoformat(timespec='milliseconds').replace('+00:00', 'Z')
+
+
+def _contexto(local_id, details):
+    """What cambiar_estado needs to resume the workflow (retry_count, local_id)"""
+    details = details if isinstance(details, dict) else {}
+    return {
+        'local_id': details.get('local_id') or local_id,
+        'retry_count': details.get('retry_count', 0)
+    }
+
+
+def get_estado_actual(pedido_id):
+    """
+    Current state of an order: estado, estado_id, taskToken and contexto.
+    Strongly consistent read of the pointer; orders started before the pointer existed
+    fall back to their newest historial row (marked 'legado').
+    """
+    r = dynamodb.Table(TABLE_ESTADO_ACTUAL).get_item(Key={'pedido_id': pedido_id}, ConsistentRead=True)
+    if r.get('Item'):
+        return r['Item']
+
+    r = dynamodb.Table(TABLE_HISTORIAL_ESTADOS).query(
+        KeyConditionExpression=Key('pedido_id').eq(pedido_id),
+        ScanIndexForward=False,
+        Limit=1
+    )
+    items = r.get('Items', [])
+    if not items:
+        return None
+    ultimo = items[0]
+    actual = {
+        'pedido_id': pedido_id,
+        'estado': ultimo.get('estado'),
+        'estado_id': ultimo['estado_id'],
+        'contexto': _contexto(None, ultimo.get('details')),
+        'legado': True
+    }
+    if ultimo.get('taskToken'):
+        actual['taskToken'] = ultimo['taskToken']
+    return actual
+
+
+def consumir_token(actual):
+    """
+    Takes the task token out of the pointer, only if it is still the one we read
+    (same estado_id and token). Exactly one caller wins per token: a double tap or an
+    EventBridge redelivery finds it gone. Legacy orders without pointer are not guarded.
+    """
+    if actual.get('legado'):
+        return True
+    try:
+        dynamodb.Table(TABLE_ESTADO_ACTUAL).update_item(
+            Key={'pedido_id': actual['pedido_id']},
+            UpdateExpression='REMOVE taskToken SET token_consumido_at = :ahora',
+            ConditionExpression='estado_id = :eid AND taskToken = :tok',
+            ExpressionAttributeValues={
+                ':eid': actual['estado_id'],
+                ':tok': actual['taskToken'],
+                ':ahora': marca_tiempo()
+            }
+        )
+        return True
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+            return False
+        raise
+
+
+def devolver_token(actual):
+    """Puts a consumed token back when Step Functions could not be reached, so the event can be retried"""
+    if actual.get('legado'):
+        return
+    try:
+        dynamodb.Table(TABLE_ESTADO_ACTUAL).update_item(
+            Key={'pedido_id': actual['pedido_id']},
+            UpdateExpression='SET taskToken = :tok REMOVE token_consumido_at',
+            ConditionExpression='estado_id = :eid AND attribute_not_exists(taskToken)',
+            ExpressionAttributeValues={':eid': actual['estado_id'], ':tok': actual['taskToken']}
+        )
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
+
+
+def _cancelacion(e):
+    """Cancellation code per transaction item ('None' when that item was fine)"""
+    return [r.get('Code', 'None') for r in e.response.get('CancellationReasons', [])]
+
+
+def transicionar(pedido_id, local_id, nuevo_estado, empleado, details, task_token=None, final=False, contexto=None,
+                 solo_historial=False):
+    """
+    Moves an order to nuevo_estado with a single TransactWriteItems:
+      1. Pedidos: estado (+ board GSI keys)
+      2. Historial: hora_fin on the previous state's row
+      3. Historial: new row for nuevo_estado
+      4. Pointer: estado / estado_id / taskToken / contexto, conditioned on the
+         estado_id we read (optimistic lock)
+    The task token only lives in the pointer, so a transition without one also
+    retires the previous token. solo_historial skips step 1 (retry bookkeeping rows
+    whose estado is not an order state). Returns the new estado_id.
+    """
+    pedido_keys = [pedido_key(local_id, pedido_id)]
+    if PEDIDOS_SHARDS > 1:
+        pedido_keys.append({'local_id': local_id, 'pedido_id': pedido_id})  # unmigrated row
+
+    for intento in range(MAX_INTENTOS):
+        actual = get_estado_actual(pedido_id)
+        previo = actual['estado_id'] if actual else None
+        timestamp = marca_tiempo()
+
+        historial = {
+            'pedido_id': pedido_id,
+            'estado_id': timestamp,
+            'createdAt': timestamp,
+            'estado': nuevo_estado,
+            'hora_inicio': timestamp,
+            'empleado': empleado,
+            'details': details
+        }
+        if final:
+            historial['hora_fin'] = timestamp
+
+        puntero = {
+            'Put': {
+                'TableName': TABLE_ESTADO_ACTUAL,
+                'Item': {
+                    'pedido_id': pedido_id,
+                    'local_id': local_id,
+                    'estado': nuevo_estado,
+                    'estado_id': timestamp,
+                    'contexto': contexto or _contexto(local_id, details),
+                    'updated_at': timestamp
+                },
+                'ConditionExpression': 'attribute_not_exists(pedido_id)',
+            }
+        }
+        if task_token:
+            puntero['Put']['Item']['taskToken'] = task_token
+        if actual and not actual.get('legado'):
+            puntero['Put']['ConditionExpression'] = 'estado_id = :previo'
+            puntero['Put']['ExpressionAttributeValues'] = {':previo': actual['estado_id']}
+
+        cierre = []
+        if previo:
+            cierre.append({
+                'Update': {
+                    'TableName': TABLE_HISTORIAL_ESTADOS,
+                    'Key': {'pedido_id': pedido_id, 'estado_id': previo},
+                    'UpdateExpression': 'SET hora_fin = :hf',
+                    'ExpressionAttributeValues': {':hf': timestamp}
+                }
+            })
+        resto = cierre + [{'Put': {'TableName': TABLE_HISTORIAL_ESTADOS, 'Item': historial}}, puntero]
+
+        # Last option (key None): a missing order row is logged, not fatal, so historial
+        # and pointer still advance (the per-handler updates behaved the same way)
+        actualizar_pedido = TABLE_PEDIDOS and not solo_historial
+        for key in (pedido_keys if actualizar_pedido else []) + [None]:
+            # PK the order row actually lives under, so the v3 state machine can
+            # update Pedidos without recomputing the shard
+            pedido_pk = key['local_id'] if key else (actual or {}).get('pedido_pk')
+            if pedido_pk:
+                puntero['Put']['Item']['pedido_pk'] = pedido_pk
+            else:
+                puntero['Put']['Item'].pop('pedido_pk', None)
+            items = list(resto)
+            if key is None and actualizar_pedido:
+                print(f"❌ Pedido {pedido_id} not found in {TABLE_PEDIDOS} (local_id {local_id}); historial only")
+            if key:
+                items.insert(0, {
+                    'Update': {
+                        'TableName': TABLE_PEDIDOS,
+                        'Key': key,
+                        'ConditionExpression': 'attribute_exists(pedido_id)',
+                        **set_estado_kwargs(local_id, nuevo_estado)
+                    }
+                })
+            try:
+                dynamodb_client.transact_write_items(TransactItems=items)
+                print(f"✅ Pedido {pedido_id} -> {nuevo_estado} (estado_id {timestamp})")
+                return timestamp
+            except ClientError as e:
+                if e.response['Error']['Code'] != 'TransactionCanceledException':
+                    raise
+                codigos = _cancelacion(e)
+                print(f"⚠️ Transition {pedido_id} -> {nuevo_estado} cancelled: {codigos}")
+                if key and codigos and codigos[0] == 'ConditionalCheckFailed':
+                    continue  # order row lives under the other key
+                break
+
+        # Another transition moved the pointer first (or a transient conflict): re-read and retry
+        time.sleep(0.05 * (2 ** intento))
+
+    raise RuntimeError(f"Could not transition pedido {pedido_id} to {nuevo_estado}")
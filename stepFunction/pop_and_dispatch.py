@@ -1,7 +1,11 @@
 import json
 import os
 import logging
+from concurrent.futures import ThreadPoolExecutor
 import boto3
+from handlers.contexto import compactar
+# Mismo nombre que el inicio por EventBridge: un duplicado que llega por ambos caminos cae en una sola ejecución
+from handlers.start_execution import execution_name
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
@@ -11,6 +15,8 @@ sf = boto3.client("stepfunctions")
 
 QUEUE_URL = os.environ["QUEUE_URL"]
 STATE_MACHINE_ARN = os.environ["STATE_MACHINE_ARN"]
+# start_execution concurrentes por lote (los clientes de boto3 son thread-safe)
+DISPATCH_CONCURRENCY = int(os.environ.get("DISPATCH_CONCURRENCY", "10"))
 
 def _parse_http_body(event):
     body = event.get("body", "") or ""
@@ -27,22 +33,75 @@ def _parse_http_body(event):
 def _parse_sqs_body(body_str):
     """
     Esperado en la cola:
-      JSON: {"id_pedido":"...", "estado":"..."}
-      o texto: "id_pedido,estado" (| : ; también)
-    Devuelve (id_pedido, estado).
+      - registro de destino onFailure del Lambda startExecution:
+        {"requestPayload": {"detail": {"order_id", "local_id", "attempt"}}, ...}
+      - evento CrearPedido de EventBridge: {"detail": {"order_id", "local_id", "attempt"}}
+      - JSON plano: {"order_id" (o "id_pedido"), "local_id", "attempt" (o "intento")}
+      - texto: "order_id,local_id" (| : ; también)
+    Devuelve (order_id, local_id, attempt).
     """
     try:
         data = json.loads(body_str)
-        if isinstance(data, dict) and "estado" in data:
-            return str(data.get("id_pedido", "")), str(data["estado"])
     except Exception:
-        pass
+        data = None
+    if isinstance(data, dict):
+        data = data.get("requestPayload") or data
+        data = data.get("detail") or data
+        order_id = data.get("order_id") or data.get("pedido_id") or data.get("id_pedido")
+        if order_id:
+            return str(order_id), data.get("local_id") or "UNKNOWN", int(data.get("attempt") or data.get("intento") or 1)
     for sep in [",", "|", ":", ";"]:
         if sep in body_str:
             left, right = [s.strip() for s in body_str.split(sep, 1)]
-            if right:
-                return left, right
-    raise ValueError("Mensaje SQS inválido. Se espera {'id_pedido','estado'} o 'id,estado'.")
+            if left and right:
+                return left, right, 1
+    raise ValueError("Mensaje SQS inválido. Se espera {'order_id','local_id'} o 'order_id,local_id'.")
+
+def _despachar(m):
+    """
+    Inicia la ejecución de un mensaje. Retorna (ok, resultado):
+    ok=True  -> {"messageId", "order_id", "local_id", "executionArn"}
+    ok=False -> {"messageId", "receiptHandle", "error"}
+    """
+    try:
+        order_id, local_id, intento = _parse_sqs_body(m.get("Body", ""))
+        # Mismo input que handlers/start_execution.py: solo el contexto compacto
+        kwargs = {
+            "stateMachineArn": STATE_MACHINE_ARN,
+            "name": execution_name(order_id, intento),
+            "input": json.dumps(compactar(order_id, local_id)),
+        }
+        base = {"messageId": m.get("MessageId"), "order_id": order_id, "local_id": local_id}
+        try:
+            resp = sf.start_execution(**kwargs)
+        except sf.exceptions.ExecutionAlreadyExists:
+            # Reentrega de un mensaje ya despachado: cuenta como éxito (se borra de la cola)
+            logger.info("Ejecución %s ya existe, duplicado ignorado", kwargs["name"])
+            return True, dict(base, executionArn=None, duplicado=True)
+        return True, dict(base, executionArn=resp.get("executionArn"))
+    except Exception as e:
+        logger.exception("Error con messageId=%s: %s", m.get("MessageId"), e)
+        return False, {"messageId": m.get("MessageId"), "receiptHandle": m["ReceiptHandle"], "error": str(e)}
+
+def _borrar_lote(despachados, messages):
+    """
+    Un solo delete_message_batch para los mensajes despachados.
+    Retorna los que SQS no pudo borrar (se reportan como fallos).
+    """
+    if not despachados:
+        return []
+    receipts = {m.get("MessageId"): m["ReceiptHandle"] for m in messages}
+    entries = [{"Id": str(i), "ReceiptHandle": receipts[d["messageId"]]} for i, d in enumerate(despachados)]
+    try:
+        resp = sqs.delete_message_batch(QueueUrl=QUEUE_URL, Entries=entries)
+    except Exception as e:
+        logger.exception("Error en delete_message_batch: %s", e)
+        return [{"messageId": d["messageId"], "receiptHandle": receipts[d["messageId"]], "error": f"delete: {e}"} for d in despachados]
+    fallidos = []
+    for f in resp.get("Failed", []):
+        d = despachados[int(f["Id"])]
+        fallidos.append({"messageId": d["messageId"], "receiptHandle": receipts[d["messageId"]], "error": f"delete: {f.get('Code')} {f.get('Message', '')}".strip()})
+    return fallidos
 
 def handler(event, context):
     """
@@ -80,32 +139,15 @@ def handler(event, context):
                 "body": json.dumps({"popped": 0, "executions": [], "note": "No hay mensajes"}),
             }
 
-        executions = []
-        failures = []
-
-        for m in messages:
-            receipt = m["ReceiptHandle"]
-            body_str = m.get("Body", "")
-
-            try:
-                id_pedido, estado = _parse_sqs_body(body_str)
-
-                # 2) Invocar Step Functions con SOLO el string 'estado' como input
-                #    (input debe ser JSON, por eso lo serializamos)
-                input_json = json.dumps(estado)
-                resp = sf.start_execution(
-                    stateMachineArn=STATE_MACHINE_ARN,
-                    input=input_json
-                )
-                exec_arn = resp.get("executionArn")
-                executions.append({"messageId": m.get("MessageId"), "id_pedido": id_pedido, "estado": estado, "executionArn": exec_arn})
-
-                # 3) Borrar mensaje de la cola SOLO si la invocación fue OK
-                sqs.delete_message(QueueUrl=QUEUE_URL, ReceiptHandle=receipt)
+        # 2) Iniciar las ejecuciones en paralelo (pool acotado)
+        with ThreadPoolExecutor(max_workers=max(1, min(DISPATCH_CONCURRENCY, len(messages)))) as pool:
+            resultados = list(pool.map(_despachar, messages))
+        executions = [r for ok, r in resultados if ok]
+        failures = [r for ok, r in resultados if not ok]
 
-            except Exception as e:
-                logger.exception("Error con messageId=%s: %s", m.get("MessageId"), e)
-                failures.append({"messageId": m.get("MessageId"), "error": str(e)})
+        # 3) Borrar de la cola SOLO los despachados, en un único delete_message_batch.
+        #    Los fallidos no se borran: vuelven a ser visibles al vencer el visibility timeout.
+        failures.extend(_borrar_lote(executions, messages))
 
         status = 207 if failures else 200
         return {
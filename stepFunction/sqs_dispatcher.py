@@ -0,0 +1,32 @@
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from pop_and_dispatch import DISPATCH_CONCURRENCY, _despachar
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+def handler(event, context):
+    """
+    Event source mapping de SQS (misma cola que POST /pedidos/pop).
+    Lambda recibe el lote y borra los mensajes por su cuenta; solo se devuelven
+    los fallidos en batchItemFailures para que SQS los reintente (partial batch response).
+    """
+    records = event.get("Records", [])
+    # Mismo formato que receive_message para reutilizar _despachar / _parse_sqs_body
+    messages = [
+        {"MessageId": r["messageId"], "ReceiptHandle": r["receiptHandle"], "Body": r.get("body", "")}
+        for r in records
+    ]
+    if not messages:
+        return {"batchItemFailures": []}
+
+    with ThreadPoolExecutor(max_workers=max(1, min(DISPATCH_CONCURRENCY, len(messages)))) as pool:
+        resultados = list(pool.map(_despachar, messages))
+
+    fallidos = [r["messageId"] for ok, r in resultados if not ok]
+    logger.info("Despachados: %d | fallidos: %d", len(messages) - len(fallidos), len(fallidos))
+    if fallidos:
+        logger.info("Fallidos: %s", json.dumps(fallidos))
+    return {"batchItemFailures": [{"itemIdentifier": mid} for mid in fallidos]}
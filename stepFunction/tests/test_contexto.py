@@ -0,0 +1,84 @@
+import json
+
+import pytest
+
+# handlers.contexto creates its DynamoDB resource at import time
+pytest.importorskip("boto3")
+
+from handlers.contexto import CONTEXTO_VERSION, compactar, contexto_de
+
+# Upper bound for what any stage forwards (SQS message, task output, historial details)
+MAX_BYTES_ETAPA = 512
+
+PEDIDO = {
+    "order_id": "ORDER-0001",
+    "local_id": "LOCAL-001",
+    "direccion": "Av. Siempre Viva 742, Lima",
+    "productos": [
+        {"producto_id": f"PROD-{i:03d}", "nombre": "Ceviche mixto " * 5, "cantidad": 2, "precio": 39.9}
+        for i in range(200)
+    ],
+}
+
+
+def _bytes(payload):
+    return len(json.dumps(payload, default=str).encode("utf-8"))
+
+
+def _mensaje_cola(ctx, action):
+    """Body that procesar_pedido / delivery send to their queues"""
+    return {"order_id": ctx["order_id"], "action": action, "retry_count": ctx["retry_count"], "details": ctx}
+
+
+def _salida_cambiar_estado(ctx, evento):
+    """Task output cambiar_estado sends back to the workflow"""
+    return {
+        **compactar(ctx["order_id"], ctx["local_id"], ctx["retry_count"]),
+        "event": evento,
+        "status": "ACEPTADO",
+        "empleado_id": "12345678",
+    }
+
+
+def _recorrer_etapas(entrada):
+    """Bytes forwarded by each stage, feeding every task output into the next stage"""
+    tamanos = {"StartExecution input": _bytes(entrada)}
+    ctx = contexto_de(entrada)
+    tamanos["Cocina SQS message"] = _bytes(_mensaje_cola(ctx, "COCINAR"))
+    for evento in ("EnPreparacion", "CocinaCompleta", "Empaquetado", "PedidoEnCamino", "EntregaDelivery"):
+        salida = _salida_cambiar_estado(ctx, evento)
+        tamanos[f"{evento} task output"] = _bytes(salida)
+        ctx = contexto_de(salida)
+        tamanos[f"{evento} historial details"] = _bytes(ctx)
+    tamanos["Delivery SQS message"] = _bytes(_mensaje_cola(ctx, "DELIVERY"))
+    return tamanos
+
+
+def test_compactar_solo_lleva_la_referencia():
+    ctx = compactar("ORDER-0001", "LOCAL-001", "2")
+    assert ctx == {"order_id": "ORDER-0001", "local_id": "LOCAL-001", "retry_count": 2, "v": CONTEXTO_VERSION}
+
+
+def test_ninguna_etapa_supera_el_limite():
+    tamanos = _recorrer_etapas(compactar(PEDIDO["order_id"], PEDIDO["local_id"]))
+    assert all(n <= MAX_BYTES_ETAPA for n in tamanos.values()), tamanos
+
+
+def test_el_contexto_no_crece_entre_etapas():
+    entrada = compactar(PEDIDO["order_id"], PEDIDO["local_id"])
+    tamanos = _recorrer_etapas(entrada)
+    detalles = [n for etapa, n in tamanos.items() if etapa.endswith("historial details")]
+    assert len(set(detalles)) == 1
+    assert detalles[0] == _bytes(contexto_de(entrada))
+
+
+def test_payload_previo_con_el_pedido_completo_se_compacta():
+    # Pre-v1 executions carried the whole order (productos) nested in details
+    legado = {"order_id": PEDIDO["order_id"], "details": PEDIDO, "retry_count": 1}
+    assert _bytes(legado) > 50 * MAX_BYTES_ETAPA
+
+    ctx = contexto_de(legado)
+    assert ctx == compactar(PEDIDO["order_id"], PEDIDO["local_id"], 1)
+    tamanos = _recorrer_etapas(legado)
+    del tamanos["StartExecution input"]
+    assert all(n <= MAX_BYTES_ETAPA for n in tamanos.values()), tamanos